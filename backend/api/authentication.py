@@ -0,0 +1,72 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+TOKEN_KEY = 'token:{}'
+
+
+def get_token_cache_key(key):
+    return TOKEN_KEY.format(hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+
+def get_snapshot_fields():
+    return [
+        field.attname for field in User._meta.concrete_fields
+        if field.attname != 'password'
+    ]
+
+
+def invalidate_token(key):
+    if settings.TOKEN_CACHE_TIMEOUT:
+        cache.delete(get_token_cache_key(key))
+
+
+def invalidate_user_tokens(user_id):
+    if not settings.TOKEN_CACHE_TIMEOUT:
+        return
+    cache.delete_many([
+        get_token_cache_key(key) for key in Token.objects.filter(
+            user_id=user_id).values_list('key', flat=True)
+    ])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, хранящий пользователя токена в кэше
+
+    Снимок пользователя без пароля живёт TOKEN_CACHE_TIMEOUT секунд и
+    сбрасывается при выходе, удалении токена и изменении пользователя.
+    По умолчанию кэш включён только с общим для процессов CACHE_BACKEND.
+    """
+
+    def authenticate_credentials(self, key):
+        if not settings.TOKEN_CACHE_TIMEOUT:
+            return super().authenticate_credentials(key)
+        cache_key = get_token_cache_key(key)
+        values = cache.get(cache_key)
+        if values is None:
+            user, token = super().authenticate_credentials(key)
+            added = cache.add(
+                cache_key,
+                [getattr(user, field) for field in get_snapshot_fields()],
+                settings.TOKEN_CACHE_TIMEOUT
+            )
+            # Выход мог случиться между чтением токена и записью в кэш
+            if added and not Token.objects.filter(
+                    key=key, user__is_active=True).exists():
+                cache.delete(cache_key)
+            return user, token
+        user = User.from_db(
+            router.db_for_read(User), get_snapshot_fields(), values)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+        return user, Token(key=key, user=user)
@@ -0,0 +1,75 @@
+import hashlib
+import json
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import quote_etag
+
+from recipe.models import Favorite, Follow, ShopingCart, Tag
+
+RELATIONS_KEY = 'relations:{}'
+CONTENT_VERSION_KEY = 'content_version'
+RESPONSE_KEY = 'response:{}:{}:{}'
+TAGS_KEY = 'tags:{}'
+
+
+def get_user_relations(user):
+    """Множества id избранного, корзины и подписок пользователя"""
+    key = RELATIONS_KEY.format(user.id)
+    relations = cache.get(key)
+    if relations is None:
+        relations = {
+            'favorites': set(Favorite.objects.filter(
+                user=user).values_list('recipe_id', flat=True)),
+            'cart': set(ShopingCart.objects.filter(
+                user=user).values_list('recipe_id', flat=True)),
+            'following': set(Follow.objects.filter(
+                user=user).values_list('author_id', flat=True)),
+        }
+        cache.set(key, relations, settings.RELATIONS_CACHE_TIMEOUT)
+    return relations
+
+
+def invalidate_user_relations(user_id):
+    cache.delete(RELATIONS_KEY.format(user_id))
+
+
+def get_content_version(key=CONTENT_VERSION_KEY):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_content_version(key=CONTENT_VERSION_KEY):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), None)
+
+
+def get_tag_ids():
+    """Словарь slug -> id тегов, сбрасывается при изменении контента"""
+    key = TAGS_KEY.format(get_content_version())
+    tag_ids = cache.get(key)
+    if tag_ids is None:
+        tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, tag_ids, settings.API_CACHE_TIMEOUT)
+    return tag_ids
+
+
+def get_response_cache_key(request):
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    digest = hashlib.md5(
+        f'{request.path}?{query}'.encode('utf-8')).hexdigest()
+    return RESPONSE_KEY.format(
+        get_content_version(), request.accepted_renderer.format, digest)
+
+
+def make_etag(data):
+    content = json.dumps(
+        data, sort_keys=True, ensure_ascii=False, default=str)
+    return quote_etag(hashlib.md5(content.encode('utf-8')).hexdigest())
@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from recipe.models import Favorite, Follow, Recipe, ShopingCart
+from users.models import UserStats
+
+User = get_user_model()
+
+RECIPE_COUNTERS = {
+    Favorite: 'favorites_count',
+    ShopingCart: 'in_carts_count',
+}
+
+
+def count_subquery(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+def change_recipe_counter(recipe_ids, field, delta):
+    # Счётчик мог разойтись с данными, ниже нуля он не опускается
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        **{field: Greatest(F(field) + delta, 0)})
+
+
+def change_user_counter(user_ids, field, delta):
+    updated = UserStats.objects.filter(user_id__in=user_ids).update(
+        **{field: Greatest(F(field) + delta, 0)})
+    # Удаление без строки статистики: пользователь удаляется каскадом,
+    # пересчёт создал бы строку для удаляемого пользователя
+    if delta > 0 and updated < len(user_ids):
+        existing = UserStats.objects.filter(
+            user_id__in=user_ids).values_list('user_id', flat=True)
+        recount_user_stats(set(user_ids) - set(existing))
+
+
+def recount_recipe_stats(recipe_ids):
+    recipes = Recipe.objects.filter(pk__in=recipe_ids).annotate(
+        actual_favorites=count_subquery(Favorite, 'recipe'),
+        actual_in_carts=count_subquery(ShopingCart, 'recipe'),
+    ).only('pk', 'favorites_count', 'in_carts_count')
+    changed = []
+    for recipe in recipes:
+        if (recipe.favorites_count != recipe.actual_favorites
+                or recipe.in_carts_count != recipe.actual_in_carts):
+            recipe.favorites_count = recipe.actual_favorites
+            recipe.in_carts_count = recipe.actual_in_carts
+            changed.append(recipe)
+    Recipe.objects.bulk_update(changed, ['favorites_count', 'in_carts_count'])
+    return len(changed)
+
+
+def recount_user_stats(user_ids):
+    actual = {
+        user['pk']: user for user in User.objects.filter(
+            pk__in=user_ids
+        ).annotate(
+            actual_recipes=count_subquery(Recipe, 'author'),
+            actual_followers=count_subquery(Follow, 'author'),
+        ).values('pk', 'actual_recipes', 'actual_followers')
+    }
+    existing = UserStats.objects.in_bulk(list(actual))
+    changed, created = [], []
+    for user_id, counts in actual.items():
+        stats = existing.get(user_id)
+        if stats is None:
+            created.append(UserStats(
+                user_id=user_id,
+                recipes_count=counts['actual_recipes'],
+                followers_count=counts['actual_followers']
+            ))
+        elif (stats.recipes_count != counts['actual_recipes']
+              or stats.followers_count != counts['actual_followers']):
+            stats.recipes_count = counts['actual_recipes']
+            stats.followers_count = counts['actual_followers']
+            changed.append(stats)
+    UserStats.objects.bulk_create(created, ignore_conflicts=True)
+    UserStats.objects.bulk_update(
+        changed, ['recipes_count', 'followers_count'])
+    return len(changed) + len(created)
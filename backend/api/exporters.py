@@ -0,0 +1,81 @@
+import csv
+import io
+import os
+
+from django.conf import settings
+from rest_framework.negotiation import DefaultContentNegotiation
+
+CHUNK_SIZE = 8192
+
+
+class IgnoreFormatContentNegotiation(DefaultContentNegotiation):
+    """Параметр format выбирает формат файла, а не рендерер DRF"""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def export_txt(rows):
+    for name, amount, measurement_unit in rows:
+        yield f'{name} - {amount} {measurement_unit} \n'
+
+
+def export_csv(rows):
+    writer = csv.writer(Echo())
+    yield '\ufeff'
+    yield writer.writerow(('Ингредиент', 'Количество', 'Единица измерения'))
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def get_pdf_font():
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    font_path = settings.SHOPPING_LIST_PDF_FONT
+    if not os.path.exists(font_path):
+        return 'Helvetica'
+    if 'ShoppingListFont' not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont('ShoppingListFont', font_path))
+    return 'ShoppingListFont'
+
+
+def export_pdf(rows):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    font = get_pdf_font()
+    width, height = A4
+    margin, line_height = 50, 18
+    pdf.setFont(font, 16)
+    pdf.drawString(margin, height - margin, 'Список покупок')
+    y = height - margin - 2 * line_height
+    pdf.setFont(font, 12)
+    for name, amount, measurement_unit in rows:
+        if y < margin:
+            pdf.showPage()
+            pdf.setFont(font, 12)
+            y = height - margin
+        pdf.drawString(margin, y, f'{name} - {amount} {measurement_unit}')
+        y -= line_height
+    pdf.save()
+    buffer.seek(0)
+    while True:
+        chunk = buffer.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+SHOPPING_LIST_FORMATS = {
+    'txt': ('text/plain; charset=utf-8', export_txt),
+    'csv': ('text/csv; charset=utf-8', export_csv),
+    'pdf': ('application/pdf', export_pdf),
+}
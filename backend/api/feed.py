@@ -0,0 +1,101 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+
+from recipe.models import Follow
+from .cache import get_user_relations
+from .images import run_in_background
+from .utils import get_limited_recipes
+
+AUTHOR_KEY = 'feed:author:{}'
+TIMELINE_KEY = 'feed:user:{}'
+INVALIDATION_CHUNK_SIZE = 1000
+
+
+def make_entry(recipe):
+    return (recipe.pub_date.timestamp(), recipe.id, recipe.author_id)
+
+
+def get_author_entries(author_ids):
+    """Свежие рецепты авторов: {author_id: [(время, id, автор), ...]}"""
+    keys = {author_id: AUTHOR_KEY.format(author_id)
+            for author_id in author_ids}
+    cached = cache.get_many(keys.values())
+    entries = {author_id: cached[key] for author_id, key in keys.items()
+               if key in cached}
+    missing = [author_id for author_id in author_ids
+               if author_id not in entries]
+    if missing:
+        recipes = get_limited_recipes(
+            missing, settings.FEED_SIZE, only=('id', 'author', 'pub_date'))
+        loaded = {author_id: [make_entry(recipe) for recipe in author_recipes]
+                  for author_id, author_recipes in recipes.items()}
+        cache.set_many(
+            {keys[author_id]: author_entries
+             for author_id, author_entries in loaded.items()},
+            settings.FEED_TIMEOUT
+        )
+        entries.update(loaded)
+    return entries
+
+
+def merge_entries(*entry_lists):
+    return list(islice(
+        heapq.merge(*entry_lists, reverse=True), settings.FEED_SIZE))
+
+
+def get_timeline(user):
+    key = TIMELINE_KEY.format(user.id)
+    timeline = cache.get(key)
+    if timeline is None:
+        following = get_user_relations(user)['following']
+        timeline = merge_entries(*get_author_entries(following).values())
+        cache.set(key, timeline, settings.FEED_TIMEOUT)
+    return timeline
+
+
+def invalidate_follower_timelines(author_id):
+    """Ленты подписчиков автора соберутся заново при следующем запросе"""
+    follower_ids = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True).iterator(
+        chunk_size=INVALIDATION_CHUNK_SIZE)
+    while True:
+        keys = [TIMELINE_KEY.format(user_id) for user_id in islice(
+            follower_ids, INVALIDATION_CHUNK_SIZE)]
+        if not keys:
+            return
+        cache.delete_many(keys)
+
+
+def author_recipes_changed(author_id):
+    """Сбрасывает кэш рецептов автора и лент его подписчиков"""
+    # Подписчиков может быть сколько угодно, поэтому ленты сбрасываются
+    # в фоне. Удаление, в отличие от правки лент, не теряет изменений
+    # параллельных запросов
+    cache.delete(AUTHOR_KEY.format(author_id))
+    run_in_background(invalidate_follower_timelines, author_id)
+
+
+def follow_added(user_id, author_id):
+    key = TIMELINE_KEY.format(user_id)
+    timeline = cache.get(key)
+    if timeline is not None:
+        author_entries = get_author_entries([author_id])[author_id]
+        cache.set(key, merge_entries(author_entries, timeline),
+                  settings.FEED_TIMEOUT)
+
+
+def follow_removed(user_id, author_id):
+    key = TIMELINE_KEY.format(user_id)
+    timeline = cache.get(key)
+    if timeline is not None:
+        cache.set(key, [entry for entry in timeline if entry[2] != author_id],
+                  settings.FEED_TIMEOUT)
+
+
+def reset_timeline(user_id):
+    """Лента соберётся заново при следующем запросе"""
+    cache.delete(TIMELINE_KEY.format(user_id))
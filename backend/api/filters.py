@@ -1,21 +1,85 @@
-from django_filters import AllValuesMultipleFilter
+from django import forms
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
 from django_filters.widgets import BooleanWidget
 from rest_framework.filters import SearchFilter
 
 from recipe.models import Recipe
+from .cache import get_tag_ids, get_user_relations
+from .ingredient_index import ingredient_index
+from .search import search_recipes
+
+
+class MultipleValueFilter(filters.Filter):
+    """Все значения повторяющегося параметра без перечисления вариантов"""
+    field_class = forms.Field
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('widget', forms.SelectMultiple)
+        super().__init__(*args, **kwargs)
 
 
 class TagFavoritShopingFilter(filters.FilterSet):
-    is_in_shopping_cart = filters.BooleanFilter(widget=BooleanWidget())
-    is_favorited = filters.BooleanFilter(widget=BooleanWidget())
-    tags = AllValuesMultipleFilter(field_name="tags__slug")
-    author = AllValuesMultipleFilter(field_name="author__id")
+    is_in_shopping_cart = filters.BooleanFilter(
+        widget=BooleanWidget(), method='filter_is_in_shopping_cart')
+    is_favorited = filters.BooleanFilter(
+        widget=BooleanWidget(), method='filter_is_favorited')
+    tags = MultipleValueFilter(method='filter_tags')
+    author = MultipleValueFilter(method='filter_author')
+    search = filters.CharFilter(method='filter_search')
+    ordering = filters.ChoiceFilter(
+        choices=(('popular', 'popular'),), method='filter_ordering')
 
     class Meta:
         model = Recipe
-        fields = ["author__id", "tags__slug", "is_favorited", "is_in_shopping_cart"]
+        fields = ["author", "tags", "is_favorited", "is_in_shopping_cart"]
+
+    def filter_tags(self, queryset, name, value):
+        tag_ids = get_tag_ids()
+        ids = {tag_ids[slug] for slug in value if slug in tag_ids}
+        if not ids:
+            return queryset.none()
+        return queryset.annotate(has_tags=Exists(
+            Recipe.tags.through.objects.filter(
+                recipe_id=OuterRef('pk'), tag_id__in=ids)
+        )).filter(has_tags=True)
+
+    def filter_author(self, queryset, name, value):
+        return queryset.filter(
+            author_id__in=[id for id in value if id.isdigit()])
+
+    def filter_search(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        return search_recipes(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        if value == 'popular':
+            return queryset.order_by('-favorites_count', '-pub_date')
+        return queryset
+
+    def filter_is_favorited(self, queryset, name, value):
+        return self.filter_relation(queryset, 'favorites', value)
+
+    def filter_is_in_shopping_cart(self, queryset, name, value):
+        return self.filter_relation(queryset, 'cart', value)
+
+    def filter_relation(self, queryset, relation, value):
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.none() if value else queryset
+        recipe_ids = get_user_relations(user)[relation]
+        if value:
+            return queryset.filter(pk__in=recipe_ids)
+        return queryset.exclude(pk__in=recipe_ids)
 
 
 class IngredientSearchFilter(SearchFilter):
     search_param = 'name'
+
+    def filter_queryset(self, request, queryset, view):
+        name = request.query_params.get(self.search_param, '').strip()
+        if not name or view.action != 'list':
+            return queryset
+        return ingredient_index.search(name)
@@ -0,0 +1,136 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image
+
+from recipe.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = {
+    'thumbnail': ((320, 320), 'JPEG', 'jpg'),
+    'thumbnail_webp': ((320, 320), 'WEBP', 'webp'),
+    'webp': (None, 'WEBP', 'webp'),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_variant_name(name, variant):
+    stem, _ = os.path.splitext(name)
+    return f'{stem}_{variant}.{VARIANTS[variant][2]}'
+
+
+def generate_variants(name):
+    """Создаёт уменьшенные копии и WebP-версии загруженной картинки"""
+    try:
+        with default_storage.open(name) as file:
+            image = Image.open(file)
+            image.load()
+        for variant, (size, image_format, _) in VARIANTS.items():
+            result = image.copy()
+            if size is not None:
+                result.thumbnail(size)
+            if image_format == 'JPEG' and result.mode != 'RGB':
+                result = result.convert('RGB')
+            buffer = BytesIO()
+            result.save(
+                buffer, image_format, quality=settings.IMAGE_VARIANT_QUALITY)
+            variant_name = get_variant_name(name, variant)
+            if default_storage.exists(variant_name):
+                default_storage.delete(variant_name)
+            default_storage.save(variant_name, ContentFile(buffer.getvalue()))
+        Recipe.objects.filter(image=name).update(processed_image=name)
+    except Exception:
+        logger.exception('Не удалось обработать картинку %s', name)
+
+
+def delete_variants(name):
+    """Удаляет копии картинки, если ей больше не пользуется ни один рецепт"""
+    try:
+        if Recipe.objects.filter(image=name).exists():
+            return
+        for variant in VARIANTS:
+            default_storage.delete(get_variant_name(name, variant))
+    except Exception:
+        logger.exception('Не удалось удалить копии картинки %s', name)
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_PIPELINE_WORKERS,
+                thread_name_prefix='image-pipeline'
+            )
+    return _executor
+
+
+def run_job(func, name):
+    # Потоки пула живут долго: без этого каждый держит своё соединение
+    # с базой, а после перезапуска базы падает на мёртвом соединении
+    close_old_connections()
+    try:
+        func(name)
+    finally:
+        close_old_connections()
+
+
+def run_in_background(func, name):
+    if settings.IMAGE_PIPELINE_SYNC:
+        func(name)
+    else:
+        get_executor().submit(run_job, func, name)
+
+
+def schedule_variants(name):
+    run_in_background(generate_variants, name)
+
+
+def schedule_variants_removal(name):
+    run_in_background(delete_variants, name)
+
+
+def image_replaced(previous, name):
+    """После коммита создаёт копии новой картинки и удаляет копии старой"""
+    if name and name != previous:
+        transaction.on_commit(partial(schedule_variants, name))
+    if previous and previous != name:
+        transaction.on_commit(partial(schedule_variants_removal, previous))
+
+
+def get_variant_urls(recipe, request=None):
+    if not recipe.image:
+        return None
+    return get_variant_urls_by_name(
+        recipe.image.name, recipe.processed_image, request)
+
+
+def get_variant_urls_by_name(name, processed_image, request=None):
+    """Ссылки на копии, пока они не готовы - на исходную картинку
+
+    Готовность копий записывает в processed_image фоновая обработка,
+    поэтому хранилище здесь не опрашивается.
+    """
+    if not name:
+        return None
+    url = default_storage.url(name)
+    urls = {}
+    for variant in VARIANTS:
+        variant_url = (
+            default_storage.url(get_variant_name(name, variant))
+            if processed_image == name else url
+        )
+        urls[variant] = (request.build_absolute_uri(variant_url)
+                         if request else variant_url)
+    return urls
@@ -0,0 +1,50 @@
+import threading
+from bisect import bisect_left
+
+from recipe.models import Ingredient
+from .cache import get_content_version
+
+INGREDIENTS_VERSION_KEY = 'ingredients_version'
+
+
+class IngredientIndex:
+    """Отсортированный индекс названий ингредиентов в памяти процесса"""
+
+    def __init__(self):
+        self.version = None
+        self.keys = []
+        self.items = []
+        self.lock = threading.Lock()
+
+    def rebuild(self, version):
+        items = sorted(
+            (Ingredient(id=id, name=name, measurement_unit=measurement_unit)
+             for id, name, measurement_unit in Ingredient.objects.values_list(
+                 'id', 'name', 'measurement_unit')),
+            key=lambda item: (item.name.casefold(), item.id)
+        )
+        self.keys = [item.name.casefold() for item in items]
+        self.items = items
+        self.version = version
+
+    def ensure_fresh(self):
+        version = get_content_version(INGREDIENTS_VERSION_KEY)
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.rebuild(version)
+
+    def search(self, query):
+        self.ensure_fresh()
+        keys, items = self.keys, self.items
+        query = query.strip().casefold()
+        start = bisect_left(keys, query)
+        end = bisect_left(keys, query + '\U0010ffff', start)
+        contains = [
+            item for key, item in zip(keys, items)
+            if query in key and not key.startswith(query)
+        ]
+        return items[start:end] + contains
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,187 @@
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from foodgram.db_pool.base import pools
+from recipe.models import Recipe, Tag
+
+User = get_user_model()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = 'Замеряет время, число запросов и память основных эндпоинтов'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument(
+            "--user", type=str, help="username of the benchmark user")
+        parser.add_argument(
+            "--cold-cache", action="store_true",
+            help="clear the cache before every request")
+        parser.add_argument("--label", type=str, default='')
+        parser.add_argument("--output", type=str, help="JSON report path")
+        parser.add_argument(
+            "--compare", type=str, help="previous JSON report path")
+
+    def handle(self, *args, **options):
+        user = self.get_user(options["user"])
+        token, _ = Token.objects.get_or_create(user=user)
+        clients = {
+            'anonymous': Client(),
+            'user': Client(HTTP_AUTHORIZATION=f'Token {token.key}'),
+        }
+        results = {}
+        for name, client_name, url in self.get_scenarios(user):
+            results[name] = self.measure(
+                clients[client_name], url, options)
+            self.stdout.write(
+                f'{name}: {results[name]["p50_ms"]} мс (p99 '
+                f'{results[name]["p99_ms"]}), запросов: '
+                f'{results[name]["queries"]}, соединений на запрос: '
+                f'{results[name]["connections_per_request"]}')
+        report = {
+            'label': options["label"],
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'database': connection.vendor,
+            'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+            'pool_size': (
+                connection.settings_dict.get('POOL') or {}).get('SIZE', 0),
+            'iterations': options["iterations"],
+            'cold_cache': options["cold_cache"],
+            'recipes': Recipe.objects.count(),
+            'users': User.objects.count(),
+            'results': results,
+        }
+        content = json.dumps(report, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], 'w', encoding='utf-8') as f:
+                f.write(content)
+        else:
+            self.stdout.write(content)
+        if options["compare"]:
+            self.compare(options["compare"], results)
+
+    def get_user(self, username):
+        if username:
+            user = User.objects.filter(username=username).first()
+        else:
+            user = User.objects.annotate(
+                carts=Count('cart', distinct=True),
+                follows=Count('follower', distinct=True),
+            ).order_by('-follows', '-carts', 'id').first()
+        if user is None:
+            raise CommandError(
+                'Нет пользователей, сначала запустите generate_data')
+        return user
+
+    def get_scenarios(self, user):
+        recipe = Recipe.objects.order_by('-pub_date').first()
+        if recipe is None:
+            raise CommandError(
+                'Нет рецептов, сначала запустите generate_data')
+        tags = '&'.join(
+            f'tags={slug}' for slug in
+            Tag.objects.values_list('slug', flat=True)[:2])
+        return (
+            ('recipes_list', 'user', '/api/recipes/'),
+            ('recipes_list_anonymous', 'anonymous', '/api/recipes/'),
+            ('recipes_list_page_10', 'user', '/api/recipes/?page=10'),
+            ('recipes_detail', 'user', f'/api/recipes/{recipe.id}/'),
+            ('recipes_filter_tags', 'user', f'/api/recipes/?{tags}'),
+            ('recipes_filter_author', 'user',
+             f'/api/recipes/?author={recipe.author_id}'),
+            ('recipes_filter_favorited', 'user',
+             '/api/recipes/?is_favorited=1'),
+            ('recipes_filter_in_cart', 'user',
+             '/api/recipes/?is_in_shopping_cart=1'),
+            ('subscriptions', 'user',
+             '/api/users/subscriptions/?recipes_limit=3'),
+            ('download_shopping_cart', 'user',
+             '/api/recipes/download_shopping_cart/'),
+            ('shopping_list', 'user', '/api/recipes/shopping_list/'),
+        )
+
+    def request(self, client, url, cold_cache):
+        if cold_cache:
+            cache.clear()
+        response = client.get(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        # Тестовый клиент не закрывает соединения, как это делает сервер
+        close_old_connections()
+        return response
+
+    def count_connection(self, **kwargs):
+        self.connections += 1
+
+    def measure(self, client, url, options):
+        cold_cache = options["cold_cache"]
+        for _ in range(options["warmup"]):
+            self.request(client, url, cold_cache)
+        timings, queries = [], []
+        # connection_created срабатывает и на выдачу соединения из пула,
+        # поэтому с пулом считаются реально открытые соединения
+        pool = pools.get(connection.alias)
+        created = pool.created if pool else 0
+        self.connections = 0
+        connection_created.connect(self.count_connection)
+        for _ in range(options["iterations"]):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = self.request(client, url, cold_cache)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(context.captured_queries))
+        connection_created.disconnect(self.count_connection)
+        if pool:
+            self.connections = pool.created - created
+        tracemalloc.start()
+        self.request(client, url, cold_cache)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {
+            'url': url,
+            'status': response.status_code,
+            'queries': max(queries),
+            'connections_per_request': round(
+                self.connections / options["iterations"], 2),
+            'p50_ms': round(statistics.median(timings), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+            'mean_ms': round(statistics.mean(timings), 2),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    def compare(self, path, results):
+        with open(path, encoding='utf-8') as f:
+            previous = json.load(f)['results']
+        self.stdout.write('Сравнение с предыдущим замером:')
+        for name, result in results.items():
+            before = previous.get(name)
+            if before is None:
+                continue
+            change = (
+                (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100
+                if before['p50_ms'] else 0
+            )
+            self.stdout.write(
+                f'{name}: p50 {before["p50_ms"]} -> {result["p50_ms"]} мс '
+                f'({change:+.1f}%), запросов {before["queries"]} -> '
+                f'{result["queries"]}')
+
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from api.images import generate_variants
+from recipe.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создаёт копии картинок рецептов, для которых их ещё нет'
+
+    def handle(self, *args, **options):
+        names = Recipe.objects.exclude(
+            processed_image=F('image')
+        ).order_by('image').values_list('image', flat=True).distinct()
+        processed = 0
+        for name in names.iterator():
+            if name:
+                generate_variants(name)
+                processed += 1
+        self.stdout.write(f'Обработано картинок: {processed}')
@@ -1,6 +1,73 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from .cache import get_content_version
+
+COUNT_KEY = 'count:{}'
+
+
+class CachedCountPaginator(Paginator):
+    """Кэширует COUNT(*) по тексту запроса и версии контента"""
+
+    @cached_property
+    def count(self):
+        timeout = settings.PAGINATION_COUNT_CACHE_TIMEOUT
+        if not timeout or not hasattr(self.object_list, 'query'):
+            return super().count
+        digest = hashlib.md5(
+            f'{get_content_version()}:{self.object_list.query}'.encode('utf-8')
+        ).hexdigest()
+        key = COUNT_KEY.format(digest)
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, timeout)
+        return count
+
+
+class RecipeCursorPagination(CursorPagination):
+    page_size = 6
+    page_size_query_param = 'limit'
+    ordering = ('-pub_date', '-id')
+
+
+class SubscriptionCursorPagination(CursorPagination):
+    page_size = 6
+    page_size_query_param = 'limit'
+    ordering = '-id'
 
 
 class LimitPageNumberPagination(PageNumberPagination):
     page_size = 6
-    page_size_query_param = 'limit'
\ No newline at end of file
+    page_size_query_param = 'limit'
+    django_paginator_class = CachedCountPaginator
+    mode_query_param = 'pagination'
+    cursor_pagination_class = None
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (self.cursor_pagination_class is not None
+                and request.query_params.get(
+                    self.mode_query_param) == 'cursor'):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class RecipePagination(LimitPageNumberPagination):
+    cursor_pagination_class = RecipeCursorPagination
+
+
+class SubscriptionPagination(LimitPageNumberPagination):
+    cursor_pagination_class = SubscriptionCursorPagination
@@ -0,0 +1,61 @@
+from django.db import connections
+
+
+def insert_ignore(model, rows=None, returning=None, **values):
+    """Вставляет строки одним запросом, пропуская уже существующие
+
+    Строки передаются списком словарей rows или одной строкой в именованных
+    аргументах. Возвращает число вставленных строк, а с returning — значения
+    этого поля у действительно вставленных строк.
+    Сигналы post_save не отправляются.
+    """
+    rows = [values] if rows is None else rows
+    if not rows:
+        return [] if returning else 0
+    connection = connections['default']
+    ops = connection.ops
+    names = list(rows[0])
+    fields = [model._meta.get_field(name) for name in names]
+    sql = '{} {} ({}) VALUES {} {}'.format(
+        ops.insert_statement(ignore_conflicts=True),
+        ops.quote_name(model._meta.db_table),
+        ', '.join(ops.quote_name(field.column) for field in fields),
+        ', '.join(['({})'.format(', '.join(['%s'] * len(fields)))]
+                  * len(rows)),
+        ops.ignore_conflicts_suffix_sql(ignore_conflicts=True),
+    )
+    params = [
+        field.get_db_prep_save(row[name], connection)
+        for row in rows for name, field in zip(names, fields)
+    ]
+    return execute_returning(connection, model, sql, params, returning)
+
+
+def raw_delete(queryset, returning=None):
+    """Удаляет строки одним запросом без сигналов
+
+    Возвращает их число, а с returning — значения этого поля у удалённых
+    строк: параллельный запрос, удаливший строку раньше, её не получит.
+    """
+    if returning is None:
+        return queryset._raw_delete(queryset.db)
+    connection = connections[queryset.db]
+    ops = connection.ops
+    meta = queryset.model._meta
+    sql, params = queryset.order_by().values('pk').query.get_compiler(
+        queryset.db).as_sql()
+    sql = 'DELETE FROM {} WHERE {} IN ({})'.format(
+        ops.quote_name(meta.db_table), ops.quote_name(meta.pk.column), sql)
+    return execute_returning(
+        connection, queryset.model, sql, params, returning)
+
+
+def execute_returning(connection, model, sql, params, returning):
+    if returning:
+        sql += ' RETURNING {}'.format(connection.ops.quote_name(
+            model._meta.get_field(returning).column))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        if returning:
+            return [row[0] for row in cursor.fetchall()]
+        return cursor.rowcount
@@ -0,0 +1,64 @@
+import gzip
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson, если он установлен, со сжатием gzip
+
+    Вывод совпадает с JSONRenderer побайтно, кроме записи очень больших
+    и очень малых float. Сжатие включается настройкой API_GZIP_MIN_LENGTH
+    для ответов не короче этой длины.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        content = self.render_json(
+            data, accepted_media_type, renderer_context)
+        return self.compress(content, renderer_context)
+
+    def render_json(self, data, accepted_media_type, renderer_context):
+        if (data is None or orjson is None or not self.compact
+                or self.ensure_ascii
+                or self.get_indent(accepted_media_type, renderer_context)):
+            return super().render(
+                data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(
+                data, default=JSONEncoder().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME
+            )
+        except TypeError:
+            return super().render(
+                data, accepted_media_type, renderer_context)
+        # Как и JSONRenderer, экранируем разделители строк для JavaScript
+        if b'\xe2\x80' in content:
+            content = content.replace(
+                b'\xe2\x80\xa8', b'\\u2028').replace(
+                b'\xe2\x80\xa9', b'\\u2029')
+        return content
+
+    def compress(self, content, renderer_context):
+        request = renderer_context.get('request')
+        response = renderer_context.get('response')
+        min_length = settings.API_GZIP_MIN_LENGTH
+        if (not min_length or request is None or response is None
+                or getattr(response, 'accepted_renderer', None) is not self
+                or len(content) < min_length):
+            return content
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if 'gzip' not in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+            return content
+        response['Content-Encoding'] = 'gzip'
+        etag = response.get('ETag')
+        if etag and not etag.startswith('W/'):
+            response['ETag'] = f'W/{etag}'
+        return gzip.compress(content, settings.API_GZIP_LEVEL)
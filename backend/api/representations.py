@@ -0,0 +1,90 @@
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from recipe.models import IngredientInRecipe, Recipe
+from .images import get_variant_urls_by_name
+
+RECIPE_FIELDS = (
+    'id', 'name', 'image', 'processed_image', 'text', 'pub_date',
+    'cooking_time',
+    'author_id', 'author__email', 'author__username', 'author__first_name',
+    'author__last_name',
+)
+
+
+def get_recipe_rows(queryset):
+    """Строки рецептов для represent_recipes вместо экземпляров модели"""
+    return queryset.select_related(None).prefetch_related(None).values(
+        *RECIPE_FIELDS)
+
+
+def format_datetime(value):
+    """Как DateTimeField DRF в формате ISO 8601"""
+    value = timezone.localtime(value).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def build_url(request, url):
+    return request.build_absolute_uri(url) if request else url
+
+
+def represent_recipes(rows, request=None, relations=None):
+    """Тот же JSON, что и у RecipeListSerializer, без сериализаторов DRF"""
+    rows = list(rows)
+    recipe_ids = [row['id'] for row in rows]
+
+    tags = defaultdict(list)
+    for recipe_id, *tag in Recipe.tags.through.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('tag__name').values_list(
+        'recipe_id', 'tag__id', 'tag__name', 'tag__color', 'tag__slug'
+    ):
+        tags[recipe_id].append(dict(zip(('id', 'name', 'color', 'slug'), tag)))
+
+    ingredients = defaultdict(list)
+    for recipe_id, *ingredient in IngredientInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('ingredients__name').values_list(
+        'recipe_id', 'ingredients_id', 'ingredients__name',
+        'ingredients__measurement_unit', 'amount'
+    ):
+        ingredients[recipe_id].append(dict(zip(
+            ('id', 'name', 'measurement_unit', 'amount'), ingredient)))
+
+    following = relations['following'] if relations is not None else ()
+    favorites = relations['favorites'] if relations is not None else ()
+    cart = relations['cart'] if relations is not None else ()
+    result = []
+    for row in rows:
+        author = None
+        if row['author_id'] is not None:
+            author = {
+                'id': row['author_id'],
+                'email': row['author__email'],
+                'username': row['author__username'],
+                'first_name': row['author__first_name'],
+                'last_name': row['author__last_name'],
+                'is_subscribed': row['author_id'] in following,
+            }
+        image = row['image']
+        result.append({
+            'id': row['id'],
+            'ingredients': ingredients[row['id']],
+            'author': author,
+            'name': row['name'],
+            'image': build_url(
+                request, default_storage.url(image)) if image else None,
+            'image_variants': get_variant_urls_by_name(
+                image, row['processed_image'], request),
+            'text': row['text'],
+            'tags': tags[row['id']],
+            'pub_date': format_datetime(row['pub_date']),
+            'cooking_time': row['cooking_time'],
+            'is_favorited': row['id'] in favorites,
+            'is_in_shopping_cart': row['id'] in cart,
+        })
+    return result
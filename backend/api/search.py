@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, TrigramSimilarity)
+from django.db import connection
+from django.db.models import F, OuterRef, Q, Subquery, TextField
+
+from recipe.models import IngredientInRecipe, Recipe
+from .transactions import on_commit_once
+
+
+def update_search_vector(recipe_ids):
+    if connection.vendor != 'postgresql':
+        return
+    from django.contrib.postgres.aggregates import StringAgg
+
+    config = settings.RECIPE_SEARCH_CONFIG
+    ingredient_names = IngredientInRecipe.objects.filter(
+        recipe=OuterRef('pk')
+    ).values('recipe').annotate(
+        names=StringAgg('ingredients__name', delimiter=' ')
+    ).values('names')
+    Recipe.objects.filter(pk__in=recipe_ids).update(search_vector=(
+        SearchVector('name', weight='A', config=config)
+        + SearchVector(
+            Subquery(ingredient_names, output_field=TextField()),
+            weight='B', config=config)
+        + SearchVector('text', weight='C', config=config)
+    ))
+
+
+def schedule_search_vector_update(recipe_id):
+    """Одно обновление вектора рецепта после коммита транзакции"""
+    on_commit_once(update_search_vector, (recipe_id,))
+
+
+def search_recipes(queryset, query):
+    if connection.vendor != 'postgresql':
+        return queryset.filter(
+            Q(name__icontains=query)
+            | Q(text__icontains=query)
+            | Q(ingredients__name__icontains=query)
+        ).distinct()
+    search_query = SearchQuery(query, config=settings.RECIPE_SEARCH_CONFIG)
+    found = queryset.filter(search_vector=search_query).annotate(
+        rank=SearchRank(F('search_vector'), search_query)
+    ).order_by('-rank', '-pub_date')
+    if found.exists():
+        return found
+    return queryset.annotate(
+        similarity=TrigramSimilarity('name', query)
+    ).filter(
+        similarity__gt=settings.RECIPE_SEARCH_TRIGRAM_THRESHOLD
+    ).order_by('-similarity', '-pub_date')
@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.db.models import F
 from django.forms import ValidationError
 from drf_extra_fields.fields import Base64ImageField
@@ -7,9 +9,20 @@ from rest_framework import serializers
 from users.serializers import CustomUserSerializer
 from recipe.models import (Follow, Ingredient, IngredientInRecipe,
                            Recipe, Tag)
+from .images import get_variant_urls, image_replaced
+from .queries import raw_delete
+from .search import schedule_search_vector_update
+from .shopping_list import recipe_ingredients_changed
 
 User = get_user_model()
 
+def to_int(value, message):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise serializers.ValidationError(message)
+
+
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ingredient
@@ -22,6 +35,15 @@ class TagSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class ImageVariantsField(serializers.ReadOnlyField):
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        return get_variant_urls(recipe, self.context.get('request'))
+
+
 class RecipeIngredientReadSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField(source='ingredients.id')
     name = serializers.ReadOnlyField(source='ingredients.name')
@@ -35,24 +57,29 @@ class RecipeIngredientReadSerializer(serializers.ModelSerializer):
 
 class RecipeListSerializer(serializers.ModelSerializer):
     author = CustomUserSerializer()
-    ingredients = serializers.SerializerMethodField()
+    ingredients = RecipeIngredientReadSerializer(
+        source='ingredient', many=True)
     tags = TagSerializer(many=True)
-    is_favorited = serializers.BooleanField(default=False)
-    is_in_shopping_cart = serializers.BooleanField(default=False)
+    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         fields = (
-            'id', 'ingredients', 'author', 'name', 'image',
+            'id', 'ingredients', 'author', 'name', 'image', 'image_variants',
             'text', 'tags', 'pub_date', 'cooking_time', 'is_favorited',
             'is_in_shopping_cart'
 
         )
         model = Recipe
 
-    def get_ingredients(self, obj):
-        return obj.ingredients.values(
-            'id', 'name', 'measurement_unit', amount=F('recipe__amount')
-        )
+    def get_is_favorited(self, obj):
+        relations = self.context.get('relations')
+        return relations is not None and obj.id in relations['favorites']
+
+    def get_is_in_shopping_cart(self, obj):
+        relations = self.context.get('relations')
+        return relations is not None and obj.id in relations['cart']
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
@@ -72,73 +99,129 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 
     def validate(self, data):
         ingredients = self.initial_data.get('ingredients')
-        unique_ingredients = set()
-        cooking_time = self.initial_data.get('cooking_time')
+        if not isinstance(ingredients, list) or not all(
+                isinstance(ingredient, dict) for ingredient in ingredients):
+            raise serializers.ValidationError(
+                'Ингредиенты должны быть списком с id и количеством'
+            )
+        unique_ingredients = {}
         for ingredient in ingredients:
-            if type(ingredient.get('amount')) == str:
-                if not ingredient.get('amount').isdigit():
-                    raise serializers.ValidationError(
-                        ('Количество ингредиента дольжно быть числом')
-                    )
-            if int(ingredient.get('amount')) <= 0:
+            amount = to_int(
+                ingredient.get('amount'),
+                'Количество ингредиента дольжно быть числом'
+            )
+            if amount <= 0:
                 raise ValidationError(
                     'Количество ингредиента должно быть больше 0'
                 )
-            id = ingredient.get('id')
+            id = to_int(
+                ingredient.get('id'), 'id ингредиента должен быть числом')
             if id in unique_ingredients:
                 raise ValidationError(
                     'Ингредиент не должен повторяться'
                 )
-            unique_ingredients.add(id)
-        if int(cooking_time) <= 0:
+            unique_ingredients[id] = amount
+        cooking_time = to_int(
+            self.initial_data.get('cooking_time'),
+            'Время готовки должно быть числом'
+        )
+        if cooking_time <= 0:
             raise ValidationError(
                 'Время готовки должно быть больше 0'
             )
-        data['ingredients'] = ingredients
+        missing = unique_ingredients.keys() - set(Ingredient.objects.filter(
+            id__in=unique_ingredients).values_list('id', flat=True))
+        if missing:
+            raise ValidationError(
+                f'Ингредиенты не найдены: {sorted(missing)}'
+            )
+        tags = self.initial_data.get('tags', [])
+        if not isinstance(tags, list):
+            raise serializers.ValidationError('Теги должны быть списком id')
+        tags = {to_int(id, 'id тега должен быть числом') for id in tags}
+        missing = tags - set(Tag.objects.filter(
+            id__in=tags).values_list('id', flat=True))
+        if missing:
+            raise ValidationError(
+                f'Теги не найдены: {sorted(missing)}'
+            )
+        data['ingredients'] = unique_ingredients
+        data['tags'] = tags
         data['cooking_time'] = cooking_time
         return data
 
-    def tag_ingredient_add(self, instance, **validated_data):
-        tags = validated_data['tags']
+    def tag_ingredient_add(self, instance, created=False, **validated_data):
+        instance.tags.set(validated_data['tags'])
         ingredients = validated_data['ingredients']
-
-        for tag in tags:
-            instance.tags.add(tag)
-
-        for ingredient in ingredients:
-            currents_ingredients = ingredient.get('id')
-            currents_amount = ingredient.get('amount')
-
-            IngredientInRecipe.objects.create(                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                              
-                ingredients_id=currents_ingredients,
-                amount=currents_amount,
+        current = {} if created else {
+            row.ingredients_id: row
+            for row in IngredientInRecipe.objects.filter(recipe=instance)
+        }
+
+        if not created:
+            deltas = {
+                ingredient_id: amount - getattr(
+                    current.get(ingredient_id), 'amount', 0)
+                for ingredient_id, amount in ingredients.items()
+            }
+            deltas.update({
+                ingredient_id: -current[ingredient_id].amount
+                for ingredient_id in current.keys() - ingredients.keys()
+            })
+            recipe_ingredients_changed(instance.pk, deltas)
+
+        removed = current.keys() - ingredients.keys()
+        if removed:
+            # Без сигналов: списки покупок уже пересчитаны по deltas выше
+            raw_delete(IngredientInRecipe.objects.filter(
+                recipe=instance, ingredients_id__in=removed))
+        changed = []
+        for ingredient_id, row in current.items():
+            amount = ingredients.get(ingredient_id)
+            if amount is not None and row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        if changed:
+            IngredientInRecipe.objects.bulk_update(changed, ['amount'])
+        IngredientInRecipe.objects.bulk_create([
+            IngredientInRecipe(
+                ingredients_id=ingredient_id,
+                amount=ingredients[ingredient_id],
                 recipe=instance
-                )
+            )
+            for ingredient_id in ingredients.keys() - current.keys()
+        ])
+        schedule_search_vector_update(instance.pk)
         return instance
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
-        tags = self.initial_data.get('tags')
+        tags = validated_data.pop('tags')
         recipe = super().create(validated_data)
+        image_replaced(None, recipe.image.name)
         return self.tag_ingredient_add(
-            recipe, ingredients=ingredients, tags=tags)
+            recipe, created=True, ingredients=ingredients, tags=tags)
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.ingredients.clear()
-        instance.tags.clear()
         ingredients = validated_data.pop('ingredients')
-        tags = self.initial_data.get('tags')
-        instance = self.tag_ingredient_add(
+        tags = validated_data.pop('tags')
+        previous_image = instance.image.name
+        instance = super().update(instance, validated_data)
+        if 'image' in validated_data:
+            image_replaced(previous_image, instance.image.name)
+        return self.tag_ingredient_add(
             instance, ingredients=ingredients, tags=tags)
-        return super().update(instance, validated_data)
 
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
     image = Base64ImageField()
-    
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
         read_only_fields = ('id', 'name', 'image', 'cooking_time')
 
 
@@ -158,17 +241,30 @@ class FollowSerializer(serializers.ModelSerializer):
                   'is_subscribed', 'recipes', 'recipes_count')
 
     def get_is_subscribed(self, obj):
-        return Follow.objects.filter(
-            user=obj.user, author=obj.author
-        ).exists()
+        return True
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        queryset = Recipe.objects.filter(author=obj.author)
-        if limit:
-            queryset = queryset[:int(limit)]
+        recipes = self.context.get('recipes')
+        if recipes is not None:
+            queryset = recipes.get(obj.author_id, [])
+        else:
+            request = self.context.get('request')
+            limit = request.GET.get('recipes_limit')
+            queryset = Recipe.objects.filter(author=obj.author)
+            if limit:
+                queryset = queryset[:int(limit)]
         return ShortRecipeSerializer(queryset, many=True).data
 
     def get_recipes_count(self, obj):
+        stats = getattr(obj.author, 'stats', None)
+        if stats is not None:
+            return stats.recipes_count
         return Recipe.objects.filter(author=obj.author).count()
+
+
+class BatchSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BATCH_MAX_SIZE,
+    )
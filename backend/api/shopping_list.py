@@ -0,0 +1,103 @@
+from django.conf import settings
+from django.db import connection, transaction
+
+from recipe.models import IngredientInRecipe, ShopingCart, ShoppingListItem
+from .queries import raw_delete
+
+UPSERT_SQL = (
+    'INSERT INTO {table} (user_id, ingredient_id, total_amount) {select} '
+    'ON CONFLICT (user_id, ingredient_id) DO UPDATE SET '
+    'total_amount = {table}.total_amount + EXCLUDED.total_amount'
+)
+
+
+def tables():
+    return {
+        'table': ShoppingListItem._meta.db_table,
+        'ingredients': IngredientInRecipe._meta.db_table,
+        'cart': ShopingCart._meta.db_table,
+    }
+
+
+def upsert(select, params):
+    names = tables()
+    with connection.cursor() as cursor:
+        cursor.execute(UPSERT_SQL.format(
+            table=names['table'], select=select.format(**names)), params)
+
+
+def remove_empty(**lookups):
+    raw_delete(ShoppingListItem.objects.filter(
+        total_amount__lte=0, **lookups))
+
+
+def placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def cart_changed(user_id, recipe_ids, sign=1):
+    """Прибавляет или вычитает ингредиенты рецептов из списка покупок"""
+    if not recipe_ids:
+        return
+    upsert(
+        'SELECT %s, ingredients_id, SUM(amount) * %s FROM {ingredients} '
+        f'WHERE recipe_id IN ({placeholders(recipe_ids)}) '
+        'GROUP BY ingredients_id',
+        [user_id, sign, *recipe_ids]
+    )
+    if sign < 0:
+        remove_empty(user_id=user_id)
+
+
+def recipe_ingredients_changed(recipe_id, deltas):
+    """Переносит изменения количеств в рецепте на все корзины с ним"""
+    deltas = {
+        ingredient_id: delta for ingredient_id, delta in deltas.items()
+        if delta
+    }
+    if not deltas:
+        return
+    values = ' UNION ALL '.join(['SELECT %s AS ingredient_id, %s AS delta']
+                                * len(deltas))
+    upsert(
+        'SELECT cart.user_id, changes.ingredient_id, changes.delta '
+        f'FROM {{cart}} cart CROSS JOIN ({values}) changes '
+        'WHERE cart.recipe_id = %s',
+        [value for item in deltas.items() for value in item] + [recipe_id]
+    )
+    decreased = [
+        ingredient_id for ingredient_id, delta in deltas.items() if delta < 0
+    ]
+    if decreased:
+        remove_empty(
+            ingredient_id__in=decreased,
+            user_id__in=ShopingCart.objects.filter(
+                recipe_id=recipe_id).values('user_id')
+        )
+
+
+def rebuild_shopping_lists(user_ids):
+    """Пересчитывает списки покупок пользователей из корзин"""
+    if not user_ids:
+        return
+    with transaction.atomic():
+        raw_delete(ShoppingListItem.objects.filter(user_id__in=user_ids))
+        upsert(
+            'SELECT cart.user_id, item.ingredients_id, SUM(item.amount) '
+            'FROM {cart} cart INNER JOIN {ingredients} item '
+            'ON item.recipe_id = cart.recipe_id '
+            f'WHERE cart.user_id IN ({placeholders(user_ids)}) '
+            'GROUP BY cart.user_id, item.ingredients_id',
+            list(user_ids)
+        )
+
+
+def get_shopping_list(user):
+    return ShoppingListItem.objects.filter(
+        user=user, total_amount__gt=0
+    ).order_by(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).values_list(
+        'ingredient_id', 'ingredient__name', 'total_amount',
+        'ingredient__measurement_unit'
+    ).iterator(chunk_size=settings.SHOPPING_LIST_CHUNK_SIZE)
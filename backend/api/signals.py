@@ -0,0 +1,233 @@
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      post_init, pre_migrate, pre_save)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipe.models import (Favorite, Follow, Ingredient, IngredientInRecipe,
+                           Recipe, ShopingCart, Tag)
+from . import feed, shopping_list
+from .authentication import invalidate_token, invalidate_user_tokens
+from .cache import bump_content_version, invalidate_user_relations
+from .counters import (RECIPE_COUNTERS, change_recipe_counter,
+                       change_user_counter)
+from .images import image_replaced
+from .ingredient_index import INGREDIENTS_VERSION_KEY
+from .search import schedule_search_vector_update
+from .transactions import on_commit_once
+
+User = get_user_model()
+
+# Поля автора, которые попадают в закэшированные ответы с рецептами
+AUTHOR_FIELDS = ('email', 'username', 'first_name', 'last_name')
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShopingCart)
+@receiver(post_delete, sender=ShopingCart)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def relations_changed(sender, instance, **kwargs):
+    # Как и версия контента: иначе параллельный запрос закэширует
+    # связи, прочитанные до коммита
+    on_commit_once(invalidate_user_relations, instance.user_id)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(post_delete, sender=User)
+def content_changed(sender, **kwargs):
+    # Иначе запрос до коммита закэширует старые данные под новой версией
+    on_commit_once(bump_content_version)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredients_changed(sender, **kwargs):
+    on_commit_once(bump_content_version, INGREDIENTS_VERSION_KEY)
+
+
+@receiver(pre_save, sender=User)
+def remember_author_fields(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is None or (
+            update_fields is not None
+            and not set(update_fields) & set(AUTHOR_FIELDS)):
+        return
+    instance._author_fields = User.objects.filter(
+        pk=instance.pk).values_list(*AUTHOR_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, **kwargs):
+    previous = instance.__dict__.pop('_author_fields', None)
+    if previous is not None and previous != tuple(
+            getattr(instance, field) for field in AUTHOR_FIELDS):
+        on_commit_once(bump_content_version)
+
+
+# Сброс после коммита: иначе запрос, прочитавший старые данные до
+# коммита, снова положит их в кэш
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    on_commit_once(invalidate_user_tokens, instance.pk)
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def token_changed(sender, instance, **kwargs):
+    on_commit_once(invalidate_token, instance.key)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, **kwargs):
+    schedule_search_vector_update(instance.pk)
+    if created and instance.author_id is not None:
+        # До коммита ленты могли бы закэшировать несохранённый рецепт
+        on_commit_once(feed.author_recipes_changed, instance.author_id)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    if instance.author_id is not None:
+        on_commit_once(feed.author_recipes_changed, instance.author_id)
+    image_replaced(instance.image.name, None)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        feed.follow_added(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    feed.follow_removed(instance.user_id, instance.author_id)
+
+
+# Счётчики меняются в той же транзакции, что и строки. API пишет связи
+# запросами без сигналов и меняет счётчики сам, сюда попадают админка,
+# каскадные удаления и прочие изменения через ORM
+@receiver(post_init, sender=Recipe)
+def remember_recipe_author(sender, instance, **kwargs):
+    if instance.pk is not None and 'author_id' in instance.__dict__:
+        instance._loaded_author_id = instance.author_id
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_author_counted(sender, instance, created, **kwargs):
+    if created:
+        previous = None
+    elif '_loaded_author_id' in instance.__dict__:
+        previous = instance._loaded_author_id
+    else:
+        return
+    if previous != instance.author_id:
+        if previous is not None:
+            change_user_counter([previous], 'recipes_count', -1)
+        if instance.author_id is not None:
+            change_user_counter([instance.author_id], 'recipes_count', 1)
+    instance._loaded_author_id = instance.author_id
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_author_uncounted(sender, instance, **kwargs):
+    if instance.author_id is not None:
+        change_user_counter([instance.author_id], 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_counted(sender, instance, created, **kwargs):
+    if created:
+        change_user_counter([instance.author_id], 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_uncounted(sender, instance, **kwargs):
+    change_user_counter([instance.author_id], 'followers_count', -1)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShopingCart)
+def recipe_relation_counted(sender, instance, created, **kwargs):
+    if created:
+        change_recipe_counter(
+            [instance.recipe_id], RECIPE_COUNTERS[sender], 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShopingCart)
+def recipe_relation_uncounted(sender, instance, **kwargs):
+    change_recipe_counter([instance.recipe_id], RECIPE_COUNTERS[sender], -1)
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+def ingredient_row_changed(sender, instance, **kwargs):
+    schedule_search_vector_update(instance.recipe_id)
+
+
+def get_ingredient_amount(instance):
+    return (instance.recipe_id, instance.ingredients_id, instance.amount)
+
+
+# Форма админки меняет поля до удаления строки, поэтому вычитать нужно
+# то, что было загружено из базы
+@receiver(post_init, sender=IngredientInRecipe)
+def remember_ingredient_amount(sender, instance, **kwargs):
+    if instance.pk is not None and 'amount' in instance.__dict__:
+        instance._loaded_amount = get_ingredient_amount(instance)
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+def ingredient_amount_saved(sender, instance, **kwargs):
+    previous = instance.__dict__.get('_loaded_amount')
+    deltas = {instance.ingredients_id: instance.amount}
+    if previous is not None:
+        recipe_id, ingredient_id, amount = previous
+        if recipe_id == instance.recipe_id:
+            deltas[ingredient_id] = deltas.get(ingredient_id, 0) - amount
+        else:
+            shopping_list.recipe_ingredients_changed(
+                recipe_id, {ingredient_id: -amount})
+    shopping_list.recipe_ingredients_changed(instance.recipe_id, deltas)
+    instance._loaded_amount = get_ingredient_amount(instance)
+
+
+# При удалении рецепта каскадом удаляются и строки корзин, и ингредиенты.
+# Оба обработчика срабатывают после удаления своих строк, поэтому второй
+# из них уже не находит первых и ингредиенты не вычитаются дважды.
+@receiver(post_delete, sender=IngredientInRecipe)
+def ingredient_amount_deleted(sender, instance, **kwargs):
+    recipe_id, ingredient_id, amount = instance.__dict__.get(
+        '_loaded_amount') or get_ingredient_amount(instance)
+    shopping_list.recipe_ingredients_changed(
+        recipe_id, {ingredient_id: -amount})
+
+
+@receiver(post_save, sender=ShopingCart)
+def cart_saved(sender, instance, created, **kwargs):
+    if created:
+        shopping_list.cart_changed(instance.user_id, [instance.recipe_id])
+
+
+@receiver(post_delete, sender=ShopingCart)
+def cart_deleted(sender, instance, **kwargs):
+    shopping_list.cart_changed(
+        instance.user_id, [instance.recipe_id], -1)
+
+
+@receiver(pre_migrate)
+def create_search_extensions(sender, using, **kwargs):
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
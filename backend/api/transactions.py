@@ -0,0 +1,23 @@
+from django.db import connection, transaction
+
+
+def on_commit_once(func, *args):
+    """Вызывает func(*args) после коммита, один раз за транзакцию
+
+    Вне транзакции вызывает сразу. Повторные вызовы с теми же аргументами
+    до коммита ничего не добавляют.
+    """
+    pending = connection.__dict__.setdefault('pending_on_commit', {})
+    key = (func, args)
+    registered = pending.get(key)
+    if registered is not None and any(
+            callback is registered
+            for _, callback in connection.run_on_commit):
+        return
+
+    def run():
+        pending.pop(key, None)
+        func(*args)
+
+    pending[key] = run
+    transaction.on_commit(run)
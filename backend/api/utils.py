@@ -1,44 +1,124 @@
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework.response import Response
-from rest_framework.status import HTTP_201_CREATED, HTTP_204_NO_CONTENT
-
-from recipe.models import IngredientInRecipe, Recipe
-from .serializers import ShortRecipeSerializer
-
-def get_ingredients(recipes_list):
-    ingredients_dict = {}
-    for recipe in recipes_list:
-        ingredients = IngredientInRecipe.objects.filter(recipe=recipe.recipe)
-        for ingredient in ingredients:
-            amount = ingredient.amount
-            name = ingredient.ingredients.name
-            measurement_unit = ingredient.ingredients.measurement_unit
-            if name not in ingredients_dict:
-                ingredients_dict[name] = {
-                    'measurement_unit': measurement_unit,
-                    'amount': amount
-                    }
-            else:
-                ingredients_dict[name]['amount'] += amount
-    to_buy = []
-    for item in ingredients_dict:
-        to_buy.append(f'{item} - {ingredients_dict[item]["amount"]} '
-                      f'{ingredients_dict[item]["measurement_unit"]} \n')
-    return to_buy
-
-def download_file_response(list_to_download, filename):
-    response = HttpResponse(list_to_download, 'Content-Type: text/plain')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+from rest_framework.status import (HTTP_201_CREATED, HTTP_204_NO_CONTENT,
+                                   HTTP_400_BAD_REQUEST)
+
+from recipe.models import Favorite, Recipe, ShopingCart
+from .cache import invalidate_user_relations
+from .counters import RECIPE_COUNTERS, change_recipe_counter
+from .exporters import SHOPPING_LIST_FORMATS
+from .queries import insert_ignore, raw_delete
+from .serializers import BatchSerializer, ShortRecipeSerializer
+from .shopping_list import cart_changed, get_shopping_list
+
+def get_ingredients(user):
+    return (row[1:] for row in get_shopping_list(user))
+
+def get_limited_recipes(author_ids, limit=None, only=None):
+    if not author_ids:
+        return {}
+    queryset = Recipe.objects.filter(author_id__in=author_ids)
+    if only is not None:
+        queryset = queryset.only(*only)
+    if limit is not None:
+        ranked = queryset.annotate(row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=[F('pub_date').desc(), F('id').desc()]
+        ))
+        sql, params = ranked.query.sql_with_params()
+        queryset = Recipe.objects.raw(
+            f'SELECT * FROM ({sql}) ranked WHERE ranked.row_number <= %s '
+            f'ORDER BY ranked.row_number',
+            (*params, limit)
+        )
+    recipes = {author_id: [] for author_id in author_ids}
+    for recipe in queryset:
+        recipes[recipe.author_id].append(recipe)
+    return recipes
+
+def download_file_response(rows, filename, file_format='txt'):
+    content_type, export = SHOPPING_LIST_FORMATS[file_format]
+    response = StreamingHttpResponse(export(rows), content_type=content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename="{filename}.{file_format}"')
     return response
 
+ALREADY_ADDED_ERRORS = {
+    Favorite: 'Рецепт уже в избранном',
+    ShopingCart: 'Рецепт уже в списке покупок',
+}
+
+
 def obj_create(model, user, pk):
     recipe = get_object_or_404(Recipe, id=pk)
-    model.objects.create(user=user, recipe=recipe)
+    with transaction.atomic():
+        if not insert_ignore(model, user=user.id, recipe=recipe.id):
+            return Response({
+                'errors': ALREADY_ADDED_ERRORS[model]
+            }, status=HTTP_400_BAD_REQUEST)
+        change_recipe_counter([recipe.id], RECIPE_COUNTERS[model], 1)
+        if model is ShopingCart:
+            cart_changed(user.id, [recipe.id])
+    invalidate_user_relations(user.id)
     serializer = ShortRecipeSerializer(recipe)
     return Response(serializer.data, status=HTTP_201_CREATED)
 
+
 def obj_delete(model, user, pk):
-    obj = model.objects.filter(user=user, recipe__id=pk)
-    obj.delete()
+    with transaction.atomic():
+        deleted = raw_delete(model.objects.filter(user=user, recipe_id=pk))
+        if deleted:
+            change_recipe_counter([pk], RECIPE_COUNTERS[model], -deleted)
+            if model is ShopingCart:
+                cart_changed(user.id, [pk], -1)
+    if deleted:
+        invalidate_user_relations(user.id)
     return Response(status=HTTP_204_NO_CONTENT)
+
+
+def batch_relations(model, request, field, targets, add=True):
+    """Добавляет или удаляет связи пользователя с объектами из ids
+
+    Возвращает id объектов, чьи связи действительно записаны этим запросом,
+    и статус по каждому id. Сигналы моделей не отправляются.
+    """
+    serializer = BatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    ids = list(dict.fromkeys(serializer.validated_data['ids']))
+    user = request.user
+    with transaction.atomic():
+        if add:
+            found = set(targets.filter(
+                pk__in=ids).values_list('pk', flat=True))
+            changed = set(insert_ignore(model, [
+                {'user': user.id, field: id} for id in ids if id in found
+            ], returning=field))
+        else:
+            found = changed = set(raw_delete(model.objects.filter(
+                user=user, **{f'{field}__in': ids}), returning=field))
+    status = 'created' if add else 'deleted'
+    results = [{
+        'id': id,
+        'status': status if id in changed else (
+            'exists' if id in found else 'not_found')
+    } for id in ids]
+    return [id for id in ids if id in changed], results
+
+
+def batch_recipes(model, request, add=True):
+    with transaction.atomic():
+        changed, results = batch_relations(
+            model, request, 'recipe_id', Recipe.objects.all(), add)
+        if changed:
+            change_recipe_counter(
+                changed, RECIPE_COUNTERS[model], 1 if add else -1)
+            if model is ShopingCart:
+                cart_changed(request.user.id, changed, 1 if add else -1)
+    if changed:
+        invalidate_user_relations(request.user.id)
+    return Response({'results': results})
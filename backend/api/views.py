@@ -1,5 +1,6 @@
 from django.shortcuts import get_object_or_404
-from django.db.models import BooleanField, Exists, OuterRef, Value
+from django.db import transaction
+from django.db.models import Prefetch
 from django.contrib.auth import get_user_model
 from djoser.views import UserViewSet
 from rest_framework import viewsets
@@ -9,22 +10,33 @@ from rest_framework.response import Response
 from rest_framework.status import (HTTP_201_CREATED, HTTP_400_BAD_REQUEST,
                                 HTTP_201_CREATED, HTTP_204_NO_CONTENT)
 
-from recipe.models import (Favorite, Follow, Ingredient,
+from recipe.models import (Favorite, Follow, Ingredient, IngredientInRecipe,
                            Recipe, ShopingCart, Tag)
+from .cache import get_user_relations, invalidate_user_relations
+from .counters import change_user_counter
+from .exporters import (SHOPPING_LIST_FORMATS,
+                        IgnoreFormatContentNegotiation)
+from .feed import (follow_added, follow_removed, get_timeline,
+                   reset_timeline)
 from .filters import IngredientSearchFilter, TagFavoritShopingFilter
+from .mixins import CachedResponseMixin, FastReadMixin
 from .permissions import IsAdminIsOwnerOrReadOnly, IsAdminOrReadOnly
+from .representations import get_recipe_rows, represent_recipes
+from .shopping_list import get_shopping_list
 from .serializers import (FollowSerializer, IngredientSerializer,
                           RecipeCreateSerializer, RecipeListSerializer,
                           TagSerializer)
-from .pagination import LimitPageNumberPagination
-from .utils import (download_file_response, get_ingredients,
-                    obj_create, obj_delete)
+from .pagination import (LimitPageNumberPagination, RecipePagination,
+                         SubscriptionPagination)
+from .utils import (batch_recipes, batch_relations, download_file_response,
+                    get_ingredients, get_limited_recipes, insert_ignore,
+                    obj_create, obj_delete, raw_delete)
 
 
 User = get_user_model()
 
 class FollowViewSet(UserViewSet):
-    pagination_class = LimitPageNumberPagination
+    pagination_class = SubscriptionPagination
 
     @action(
         methods=['post'], detail=True, permission_classes=[IsAuthenticated])
@@ -36,64 +48,104 @@ class FollowViewSet(UserViewSet):
             return Response({
                 'errors': 'Ошибка подписки, нельзя подписываться на себя'
             }, status=HTTP_400_BAD_REQUEST)
-        if Follow.objects.filter(user=user, author=author).exists():
-            return Response({
-                'errors': 'Ошибка подписки, вы уже подписаны на пользователя'
-            }, status=HTTP_400_BAD_REQUEST)
-
-        follow = Follow.objects.create(user=user, author=author)
+        with transaction.atomic():
+            if not insert_ignore(Follow, user=user.id, author=author.id):
+                return Response({
+                    'errors': 'Ошибка подписки, вы уже подписаны на '
+                              'пользователя'
+                }, status=HTTP_400_BAD_REQUEST)
+            change_user_counter([author.id], 'followers_count', 1)
+        invalidate_user_relations(user.id)
+        follow_added(user.id, author.id)
         serializer = FollowSerializer(
-            follow, context={'request': request}
+            Follow(user=user, author=author), context={'request': request}
         )
         return Response(serializer.data, status=HTTP_201_CREATED)
 
     @subscribe.mapping.delete
     def del_subscribe(self, request, id=None):
         user = request.user
-        author = get_object_or_404(User, id=id)
-        if user == author:
+        if str(user.id) == id:
             return Response({
                 'errors': 'Ошибка отписки, нельзя отписываться от самого себя'
             }, status=HTTP_400_BAD_REQUEST)
-        follow = Follow.objects.filter(user=user, author=author)
-        if not follow.exists():
+        with transaction.atomic():
+            deleted = raw_delete(
+                Follow.objects.filter(user=user, author_id=id))
+            if deleted:
+                change_user_counter([int(id)], 'followers_count', -deleted)
+        if not deleted:
+            get_object_or_404(User, id=id)
             return Response({
                 'errors': 'Ошибка отписки, вы уже отписались'
             }, status=HTTP_400_BAD_REQUEST)
-        follow.delete()
+        invalidate_user_relations(user.id)
+        follow_removed(user.id, int(id))
         return Response(status=HTTP_204_NO_CONTENT)
 
+    @action(
+        methods=['post'], detail=False, url_path='batch/subscribe',
+        permission_classes=[IsAuthenticated])
+    def batch_subscribe(self, request):
+        return self.batch_follow(request, add=True)
+
+    @batch_subscribe.mapping.delete
+    def batch_unsubscribe(self, request):
+        return self.batch_follow(request, add=False)
+
+    def batch_follow(self, request, add):
+        user = request.user
+        with transaction.atomic():
+            changed, results = batch_relations(
+                Follow, request, 'author_id',
+                User.objects.exclude(id=user.id), add)
+            if changed:
+                change_user_counter(
+                    changed, 'followers_count', 1 if add else -1)
+        if changed:
+            invalidate_user_relations(user.id)
+            reset_timeline(user.id)
+        return Response({'results': results})
+
     @action(detail=False, permission_classes=[IsAuthenticated])
     def subscriptions(self, request):
         user = request.user
-        queryset = Follow.objects.filter(user=user)
+        queryset = Follow.objects.filter(user=user).select_related(
+            'author__stats')
         pages = self.paginate_queryset(queryset)
+        limit = request.query_params.get('recipes_limit')
+        recipes = get_limited_recipes(
+            [follow.author_id for follow in pages],
+            int(limit) if limit else None
+        )
         serializer = FollowSerializer(
             pages,
             many=True,
-            context={'request': request}
+            context={'request': request, 'recipes': recipes}
         )
         return self.get_paginated_response(serializer.data)
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [IsAdminOrReadOnly]
 
 
-class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientsViewSet(CachedResponseMixin,
+                         viewsets.ReadOnlyModelViewSet):
     permission_classes = (IsAdminOrReadOnly,)
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (IngredientSearchFilter,)
-    search_fields = ('^name',)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(CachedResponseMixin, FastReadMixin,
+                    viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
+    cache_anonymous_only = True
     filter_class = TagFavoritShopingFilter
-    pagination_class = LimitPageNumberPagination
+    pagination_class = RecipePagination
     permission_classes = [IsAdminIsOwnerOrReadOnly]
 
     def get_serializer_class(self):
@@ -104,25 +156,50 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-    def get_queryset(self):
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
         user = self.request.user
-        queryset = Recipe.objects.all()
-
         if user.is_authenticated:
-            queryset = queryset.annotate(
-                is_favorited=Exists(Favorite.objects.filter(
-                    user=user, recipe__pk=OuterRef('pk'))
-                ),
-                is_in_shopping_cart=Exists(ShopingCart.objects.filter(
-                    user=user, recipe__pk=OuterRef('pk'))
-                )
-            ) 
-        else:
-            queryset = queryset.annotate(
-                is_favorited=Value(False, output_field=BooleanField()),
-                is_in_shopping_cart=Value(False, output_field=BooleanField())
+            context['relations'] = get_user_relations(user)
+        return context
+
+    def get_rows(self, queryset):
+        return get_recipe_rows(queryset)
+
+    def represent(self, rows):
+        return represent_recipes(
+            rows, self.request,
+            self.get_serializer_context().get('relations'))
+
+    def get_queryset(self):
+        return Recipe.objects.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredient',
+                queryset=IngredientInRecipe.objects.select_related(
+                    'ingredients').order_by('ingredients__name')
             )
-        return queryset
+        )
+
+    @action(
+        detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        recipe_ids = [entry[1] for entry in get_timeline(request.user)]
+        paginator = LimitPageNumberPagination()
+        page = paginator.paginate_queryset(recipe_ids, request, view=self)
+        if self.use_fast_read():
+            rows = {row['id']: row for row in self.get_rows(
+                self.get_queryset().filter(id__in=page))}
+            return paginator.get_paginated_response(self.represent(
+                [rows[recipe_id] for recipe_id in page if recipe_id in rows]
+            ))
+        recipes = self.get_queryset().in_bulk(page)
+        serializer = RecipeListSerializer(
+            [recipes[recipe_id] for recipe_id in page if recipe_id in recipes],
+            many=True,
+            context=self.get_serializer_context()
+        )
+        return paginator.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['post'],
             permission_classes=[IsAuthenticated])
@@ -150,10 +227,47 @@ class RecipeViewSet(viewsets.ModelViewSet):
         model = ShopingCart
         return obj_delete(model=model, user=user, pk=pk)
 
+    @action(detail=False, methods=['post'], url_path='batch/favorite',
+            permission_classes=[IsAuthenticated])
+    def batch_favorite(self, request):
+        return batch_recipes(Favorite, request, add=True)
+
+    @batch_favorite.mapping.delete
+    def batch_del_favorite(self, request):
+        return batch_recipes(Favorite, request, add=False)
+
+    @action(detail=False, methods=['post'], url_path='batch/shopping_cart',
+            permission_classes=[IsAuthenticated])
+    def batch_shopping_cart(self, request):
+        return batch_recipes(ShopingCart, request, add=True)
+
+    @batch_shopping_cart.mapping.delete
+    def batch_del_shopping_cart(self, request):
+        return batch_recipes(ShopingCart, request, add=False)
+
     @action(
         detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def shopping_list(self, request):
+        return Response([
+            {
+                'id': ingredient_id,
+                'name': name,
+                'measurement_unit': measurement_unit,
+                'amount': amount,
+            }
+            for ingredient_id, name, amount, measurement_unit
+            in get_shopping_list(request.user)
+        ])
+
+    @action(
+        detail=False, methods=['get'], permission_classes=[IsAuthenticated],
+        content_negotiation_class=IgnoreFormatContentNegotiation)
     def download_shopping_cart(self, request):
-        user = request.user
-        recipes_list = user.cart.all()
-        need_to_buy = get_ingredients(recipes_list)
-        return download_file_response(need_to_buy, 'need_to_buy.txt')
+        file_format = request.query_params.get('format', 'txt')
+        if file_format not in SHOPPING_LIST_FORMATS:
+            return Response({
+                'errors': 'Формат файла должен быть одним из: '
+                          + ', '.join(SHOPPING_LIST_FORMATS)
+            }, status=HTTP_400_BAD_REQUEST)
+        need_to_buy = get_ingredients(request.user)
+        return download_file_response(need_to_buy, 'need_to_buy', file_format)
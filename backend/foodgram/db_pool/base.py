@@ -0,0 +1,155 @@
+import threading
+from collections import deque
+
+from django.db.backends.postgresql.base import \
+    DatabaseWrapper as PostgresDatabaseWrapper
+from django.db.backends.postgresql.base import Database
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """Пул соединений процесса: size постоянных и overflow временных"""
+
+    def __init__(self, connect, size, overflow=0, timeout=10,
+                 health_checks=True):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.health_checks = health_checks
+        self.idle = deque()
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(size + overflow)
+        self.created = 0
+
+    def get(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise Database.OperationalError(
+                'Нет свободных соединений в пуле')
+        try:
+            while True:
+                with self.lock:
+                    connection = self.idle.pop() if self.idle else None
+                if connection is None:
+                    connection = self.connect()
+                    self.created += 1
+                    return connection
+                if self.is_usable(connection):
+                    return connection
+                self.discard(connection)
+        except Exception:
+            self.slots.release()
+            raise
+
+    def put(self, connection):
+        try:
+            if not connection.closed and (
+                    connection.get_transaction_status()
+                    != TRANSACTION_STATUS_IDLE):
+                connection.rollback()
+            with self.lock:
+                if not connection.closed and len(self.idle) < self.size:
+                    self.idle.append(connection)
+                    return
+            self.discard(connection)
+        except Database.Error:
+            self.discard(connection)
+        finally:
+            self.slots.release()
+
+    def release(self, connection):
+        """Закрывает выданное соединение, не возвращая его в пул"""
+        try:
+            self.discard(connection)
+        finally:
+            self.slots.release()
+
+    def is_usable(self, connection):
+        if connection.closed:
+            return False
+        if not self.health_checks:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Database.Error:
+            return False
+        return True
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        except Database.Error:
+            pass
+
+
+class DatabaseWrapper(PostgresDatabaseWrapper):
+    """PostgreSQL с проверкой соединений и пулом внутри процесса
+
+    Настройки в DATABASES['default']['POOL']: SIZE (0 - без пула),
+    OVERFLOW, TIMEOUT и HEALTH_CHECKS.
+    """
+
+    health_check_done = False
+
+    @property
+    def pool_settings(self):
+        return self.settings_dict.get('POOL') or {}
+
+    @property
+    def health_checks(self):
+        return self.pool_settings.get('HEALTH_CHECKS', True)
+
+    def get_pool(self, conn_params):
+        pool = pools.get(self.alias)
+        if pool is None:
+            with pools_lock:
+                pool = pools.get(self.alias)
+                if pool is None:
+                    pool = pools[self.alias] = ConnectionPool(
+                        lambda: Database.connect(**conn_params),
+                        self.pool_settings['SIZE'],
+                        self.pool_settings.get('OVERFLOW', 0),
+                        self.pool_settings.get('TIMEOUT', 10),
+                        self.health_checks,
+                    )
+        return pool
+
+    def get_new_connection(self, conn_params):
+        if not self.pool_settings.get('SIZE'):
+            return super().get_new_connection(conn_params)
+        connection = self.get_pool(conn_params).get()
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get(
+            'isolation_level', connection.isolation_level)
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def ensure_connection(self):
+        if (self.connection is not None and not self.health_check_done
+                and self.health_checks and not self.in_atomic_block):
+            self.health_check_done = True
+            if not self.is_usable():
+                self.close()
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def _close(self):
+        pool = pools.get(self.alias)
+        if self.connection is None or pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            if self.in_atomic_block:
+                pool.release(self.connection)
+            else:
+                pool.put(self.connection)
@@ -0,0 +1,227 @@
+import logging
+import os
+import random
+import re
+import socket
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from rest_framework import serializers
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+STATS_KEY = 'profiling:{}'
+PROCESSES_KEY = 'profiling:processes'
+
+_local = threading.local()
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = Counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.query_count += 1
+            self.queries[IN_LIST.sub('IN (...)', sql)] += 1
+
+    def duplicates(self, threshold):
+        return {sql: count for sql, count in self.queries.items()
+                if count >= threshold}
+
+
+class ProfilingStats:
+    """Замеры по эндпоинтам: копятся в процессе и выгружаются в общий кэш
+
+    Каждый процесс gunicorn раз в PROFILING_FLUSH_INTERVAL секунд кладёт
+    свои замеры в кэш, отчёт собирает замеры всех живых процессов.
+    """
+
+    def __init__(self, history, flush_interval, timeout):
+        self.lock = threading.Lock()
+        self.history = history
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.samples = defaultdict(lambda: deque(maxlen=self.history))
+        self.flushed_at = 0
+        self.process = f'{socket.gethostname()}:{os.getpid()}'
+
+    def record(self, endpoint, sample):
+        now = time.monotonic()
+        with self.lock:
+            self.samples[endpoint].append(sample)
+            if now - self.flushed_at < self.flush_interval:
+                return
+            self.flushed_at = now
+        self.publish()
+
+    def snapshot(self):
+        with self.lock:
+            return {endpoint: list(values)
+                    for endpoint, values in self.samples.items()}
+
+    def publish(self):
+        try:
+            cache.set(STATS_KEY.format(self.process), self.snapshot(),
+                      self.timeout)
+            processes = cache.get(PROCESSES_KEY) or []
+            if self.process not in processes:
+                cache.set(PROCESSES_KEY, processes + [self.process], None)
+        except Exception:
+            logger.warning('Не удалось сохранить замеры в кэш', exc_info=True)
+
+    def collect(self):
+        self.publish()
+        processes = cache.get(PROCESSES_KEY) or []
+        snapshots = cache.get_many(
+            [STATS_KEY.format(process) for process in processes])
+        alive = [process for process in processes
+                 if STATS_KEY.format(process) in snapshots]
+        if alive != processes:
+            cache.set(PROCESSES_KEY, alive, None)
+        samples = defaultdict(list)
+        for snapshot in snapshots.values():
+            for endpoint, values in snapshot.items():
+                samples[endpoint].extend(values)
+        return alive, samples
+
+    def report(self):
+        processes, samples = self.collect()
+        return {
+            'processes': processes,
+            'endpoints': {
+                endpoint: {
+                    'requests': len(values),
+                    'total_ms': percentiles([value[0] for value in values]),
+                    'db_ms': percentiles([value[1] for value in values]),
+                    'serializer_ms': percentiles(
+                        [value[2] for value in values]),
+                    'queries': percentiles([value[3] for value in values]),
+                    'n_plus_one_requests': sum(
+                        1 for value in values if value[4]),
+                }
+                for endpoint, values in sorted(samples.items())
+            },
+        }
+
+
+def percentiles(values):
+    values = sorted(values)
+    result = {}
+    for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+        index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+        result[name] = round(values[index], 2)
+    return result
+
+
+stats = ProfilingStats(
+    settings.PROFILING_HISTORY, settings.PROFILING_FLUSH_INTERVAL,
+    settings.PROFILING_STATS_TIMEOUT)
+
+
+def current_profile():
+    return getattr(_local, 'profile', None)
+
+
+def timed_data(fget):
+    def data(self):
+        profile = current_profile()
+        if profile is None or profile.serializer_depth:
+            return fget(self)
+        profile.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return fget(self)
+        finally:
+            profile.serializer_time += time.perf_counter() - started
+            profile.serializer_depth -= 1
+    data.profiled = True
+    return property(data)
+
+
+def install_serializer_timing():
+    for serializer_class in (serializers.Serializer,
+                             serializers.ListSerializer):
+        fget = serializer_class.data.fget
+        if not getattr(fget, 'profiled', False):
+            serializer_class.data = timed_data(fget)
+
+
+def get_endpoint_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    view_class = getattr(match.func, 'cls', None)
+    if view_class is None:
+        return match.view_name or match.func.__name__
+    actions = getattr(match.func, 'actions', None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return f'{view_class.__name__}.{action}'
+
+
+class ProfilingMiddleware:
+    """Считает запросы к БД и время ответа для доли запросов"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.threshold = settings.PROFILING_DUPLICATE_THRESHOLD
+        if self.sample_rate:
+            install_serializer_timing()
+
+    def __call__(self, request):
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return self.get_response(request)
+        profile = RequestProfile()
+        _local.profile = profile
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(profile.record_query):
+                response = self.get_response(request)
+        finally:
+            _local.profile = None
+        total = (time.perf_counter() - started) * 1000
+        db_time = profile.db_time * 1000
+        serializer_time = profile.serializer_time * 1000
+        duplicates = profile.duplicates(self.threshold)
+        endpoint = get_endpoint_name(request)
+        stats.record(endpoint, (
+            total, db_time, serializer_time, profile.query_count,
+            bool(duplicates)
+        ))
+        response['Server-Timing'] = (
+            f'db;dur={db_time:.2f};desc="{profile.query_count} queries", '
+            f'serializer;dur={serializer_time:.2f}, total;dur={total:.2f}'
+        )
+        response['X-Query-Count'] = str(profile.query_count)
+        if duplicates:
+            response['X-Duplicate-Queries'] = str(sum(duplicates.values()))
+            for sql, count in duplicates.items():
+                logger.warning(
+                    'Возможный N+1 в %s: %d повторов запроса %s',
+                    endpoint, count, sql
+                )
+        return response
+
+
+class ProfilingStatsView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(stats.report())
@@ -2,7 +2,10 @@ from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
 
+from .profiling import ProfilingStatsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/stats/', ProfilingStatsView.as_view(), name='stats'),
     path('api/', include('api.urls', namespace='api'))
 ]
\ No newline at end of file
@@ -0,0 +1,25 @@
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv(
+    'GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+
+LOCAL_CACHE_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def on_starting(server):
+    # Кэш в памяти процесса не сбрасывается в соседних воркерах
+    if workers > 1 and os.getenv(
+            'CACHE_BACKEND', LOCAL_CACHE_BACKEND) == LOCAL_CACHE_BACKEND:
+        server.log.warning(
+            'CACHE_BACKEND не задан: у каждого из %s воркеров свой кэш, '
+            'и сброс кэша в одном не виден остальным. Укажите общий кэш, '
+            'например django_redis.cache.RedisCache', workers)
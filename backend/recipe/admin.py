@@ -1,42 +1,100 @@
-from django.contrib.admin import ModelAdmin, register
+from django.conf import settings
+from django.contrib.admin import ModelAdmin, TabularInline, register
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
 
+from api.images import image_replaced
 from .models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
                      ShopingCart, Tag)
 
 
+class EstimatedCountPaginator(Paginator):
+    """Для больших таблиц PostgreSQL без фильтров берёт оценку из статистики"""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE relname = %s',
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return int(row[0])
+        return super().count
+
+
+class LargeTableAdmin(ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
 @register(Tag)
 class TagAdmin(ModelAdmin):
     list_display = ('name', 'slug', 'color')
+    search_fields = ('name', 'slug')
 
 
 @register(Ingredient)
 class IngredientAdmin(ModelAdmin):
     list_display = ('name', 'measurement_unit')
-    list_filter = ('name',)
+    search_fields = ('^name',)
+
+
+class IngredientInRecipeInline(TabularInline):
+    model = IngredientInRecipe
+    autocomplete_fields = ('ingredients',)
+    min_num = 1
+    extra = 0
 
 
 @register(Recipe)
-class RecipeAdmin(ModelAdmin):
-    list_display = ('name', 'author')
-    list_filter = ('author', 'name', 'tags')
-    readonly_fields = ('count_favorites',)
+class RecipeAdmin(LargeTableAdmin):
+    list_display = ('name', 'author', 'pub_date', 'favorites_count',
+                    'in_carts_count')
+    list_select_related = ('author',)
+    list_filter = ('tags',)
+    search_fields = ('name', 'author__username', 'author__email')
+    autocomplete_fields = ('author', 'tags')
+    readonly_fields = ('count_favorites', 'in_carts_count')
+    exclude = ('favorites_count',)
+    inlines = (IngredientInRecipeInline,)
 
     def count_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
     count_favorites.short_description = 'Число добавлений в избранное'
 
+    def save_model(self, request, obj, form, change):
+        previous = Recipe.objects.filter(pk=obj.pk).values_list(
+            'image', flat=True).first() if change else None
+        super().save_model(request, obj, form, change)
+        if 'image' in form.changed_data:
+            image_replaced(previous, obj.image.name)
+
 
 @register(IngredientInRecipe)
-class IngredientAmountAdmin(ModelAdmin):
-    pass
+class IngredientAmountAdmin(LargeTableAdmin):
+    list_display = ('recipe', 'ingredients', 'amount')
+    list_select_related = ('recipe', 'ingredients')
+    search_fields = ('recipe__name', '^ingredients__name')
+    autocomplete_fields = ('recipe', 'ingredients')
 
 
 @register(Favorite)
-class FavoriteAdmin(ModelAdmin):
-    pass
+class FavoriteAdmin(LargeTableAdmin):
+    list_display = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username', 'user__email', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
 
 
 @register(ShopingCart)
-class CartAdmin(ModelAdmin):
-    pass
+class CartAdmin(LargeTableAdmin):
+    list_display = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username', 'user__email', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
@@ -0,0 +1,81 @@
+import csv
+import json
+import time
+
+from django.db import transaction
+
+from .models import Ingredient
+
+READ_SIZE = 64 * 1024
+
+
+def iter_json_array(file):
+    """Построчно разбирает JSON-массив, не загружая файл целиком"""
+    decoder = json.JSONDecoder()
+    buffer, position, started, eof = '', 0, False, False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if position < len(buffer):
+            if not started:
+                if buffer[position] != '[':
+                    raise ValueError('Ожидался JSON-массив')
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                if end < len(buffer) or eof:
+                    yield item
+                    position = end
+                    continue
+        if eof:
+            raise ValueError('Неожиданный конец файла')
+        chunk = file.read(READ_SIZE)
+        eof = not chunk
+        buffer, position = buffer[position:] + chunk, 0
+
+
+def iter_csv(file):
+    reader = csv.reader(file)
+    for row in reader:
+        if row[:2] == ['name', 'measurement_unit']:
+            continue
+        if len(row) >= 2:
+            yield {'name': row[0], 'measurement_unit': row[1]}
+
+
+def import_ingredients(items, batch_size=1000):
+    started = time.perf_counter()
+    seen = set()
+    total = 0
+    with transaction.atomic():
+        count_before = Ingredient.objects.count()
+        batch = []
+        for item in items:
+            total += 1
+            key = (item['name'].strip(), item['measurement_unit'].strip())
+            if not key[0] or key in seen:
+                continue
+            seen.add(key)
+            batch.append(Ingredient(name=key[0], measurement_unit=key[1]))
+            if len(batch) >= batch_size:
+                Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        if batch:
+            Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+        created = Ingredient.objects.count() - count_before
+    elapsed = time.perf_counter() - started
+    return {
+        'total': total,
+        'unique': len(seen),
+        'created': created,
+        'elapsed': elapsed,
+        'rate': total / elapsed if elapsed else 0,
+    }
@@ -0,0 +1,20 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.db.models import Index
+
+
+class PortableIndexMixin:
+    """На СУБД кроме PostgreSQL создаётся обычный индекс по тем же полям"""
+
+    def create_sql(self, model, schema_editor, using=''):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().create_sql(model, schema_editor, using=using)
+        return Index(fields=self.fields, name=self.name).create_sql(
+            model, schema_editor)
+
+
+class PortableGinIndex(PortableIndexMixin, GinIndex):
+    pass
+
+
+class PortableIndex(PortableIndexMixin, Index):
+    pass
@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from api.cache import bump_content_version
+from api.ingredient_index import INGREDIENTS_VERSION_KEY
+from api.queries import raw_delete
+from api.shopping_list import rebuild_shopping_lists
+from recipe.models import Ingredient, IngredientInRecipe, ShoppingListItem
+
+
+class Command(BaseCommand):
+    help = ('Сливает ингредиенты с одинаковыми названием и единицей '
+            'измерения, запускать перед migrate')
+
+    def handle(self, *args, **options):
+        duplicates = self.find_duplicates()
+        if not duplicates:
+            self.stdout.write('Дубликатов нет')
+            return
+        with transaction.atomic():
+            merged = self.remap_recipes(duplicates)
+            self.remap_shopping_lists(duplicates)
+            raw_delete(Ingredient.objects.filter(pk__in=list(duplicates)))
+        bump_content_version()
+        bump_content_version(INGREDIENTS_VERSION_KEY)
+        self.stdout.write(
+            f'Удалено дубликатов: {len(duplicates)}, '
+            f'объединено строк рецептов: {merged}')
+
+    def find_duplicates(self):
+        """Словарь id дубликата -> id ингредиента с наименьшим id"""
+        survivors = {}
+        duplicates = {}
+        for pk, name, measurement_unit in Ingredient.objects.order_by(
+                'pk').values_list('pk', 'name', 'measurement_unit'):
+            survivor = survivors.setdefault((name, measurement_unit), pk)
+            if survivor != pk:
+                duplicates[pk] = survivor
+        return duplicates
+
+    def remap_recipes(self, duplicates):
+        rows = IngredientInRecipe.objects.filter(
+            ingredients_id__in=set(duplicates) | set(duplicates.values()))
+        # Сначала строки оставшихся ингредиентов, к ним прибавляются дубли
+        rows = sorted(rows, key=lambda row: (
+            row.ingredients_id in duplicates, row.pk))
+        kept = {}
+        changed = {}
+        removed = []
+        for row in rows:
+            target = duplicates.get(row.ingredients_id, row.ingredients_id)
+            existing = kept.get((row.recipe_id, target))
+            if existing is None:
+                kept[(row.recipe_id, target)] = row
+                if row.ingredients_id != target:
+                    row.ingredients_id = target
+                    changed[row.pk] = row
+            else:
+                existing.amount += row.amount
+                changed[existing.pk] = existing
+                removed.append(row.pk)
+        raw_delete(IngredientInRecipe.objects.filter(pk__in=removed))
+        IngredientInRecipe.objects.bulk_update(
+            changed.values(), ['ingredients', 'amount'])
+        return len(removed)
+
+    def remap_shopping_lists(self, duplicates):
+        # До migrate таблицы списков покупок может ещё не быть
+        table = ShoppingListItem._meta.db_table
+        if table not in connection.introspection.table_names():
+            return
+        user_ids = list(ShoppingListItem.objects.filter(
+            ingredient_id__in=list(duplicates)
+        ).values_list('user_id', flat=True).distinct())
+        rebuild_shopping_lists(user_ids)
@@ -0,0 +1,210 @@
+import io
+import os
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.cache import bump_content_version
+from api.counters import recount_recipe_stats, recount_user_stats
+from api.ingredient_index import INGREDIENTS_VERSION_KEY
+from api.search import update_search_vector
+from api.shopping_list import rebuild_shopping_lists
+from recipe.importers import import_ingredients, iter_json_array
+from recipe.models import (Favorite, Follow, Ingredient, IngredientInRecipe,
+                           Recipe, ShopingCart, Tag)
+
+User = get_user_model()
+
+TAGS = (
+    ('Завтрак', 'breakfast', '#E26C2D'),
+    ('Обед', 'lunch', '#49B64E'),
+    ('Ужин', 'dinner', '#8775D2'),
+    ('Десерт', 'dessert', '#F2C94C'),
+    ('Выпечка', 'bakery', '#BB6BD9'),
+)
+IMAGE_NAME = 'recipes/benchmark.png'
+PASSWORD = 'benchmark'
+
+
+def skewed_weights(size, skew):
+    """Веса по закону Ципфа: первые элементы популярнее остальных"""
+    return [1 / (rank + 1) ** skew for rank in range(size)]
+
+
+def pick_unique(rng, population, weights, count, exclude=None):
+    count = min(count, len(population) - (exclude is not None))
+    picked = set()
+    while len(picked) < count:
+        for item in rng.choices(population, weights, k=count - len(picked)):
+            if item != exclude:
+                picked.add(item)
+    return picked
+
+
+def ensure_image():
+    if not default_storage.exists(IMAGE_NAME):
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (640, 480), '#E26C2D').save(buffer, 'PNG')
+        default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+    return IMAGE_NAME
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу синтетическими данными для нагрузочных тестов'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument(
+            "--recipes", type=int, default=10,
+            help="recipes per user on average")
+        parser.add_argument("--ingredients-per-recipe", type=int, default=8)
+        parser.add_argument(
+            "--follows", type=int, default=10, help="follows per user")
+        parser.add_argument(
+            "--favorites", type=int, default=20, help="favorites per user")
+        parser.add_argument(
+            "--cart", type=int, default=5, help="cart recipes per user")
+        parser.add_argument(
+            "--skew", type=float, default=1.0,
+            help="Zipf exponent of author and recipe popularity, 0 = uniform")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--path", type=str,
+            default=os.path.join(
+                settings.BASE_DIR, 'recipe', 'data', 'ingredients.json'),
+            help="ingredients file path")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        with open(options["path"], encoding='utf-8') as f:
+            import_ingredients(iter_json_array(f), self.batch_size)
+        with transaction.atomic():
+            Tag.objects.bulk_create([
+                Tag(name=name, slug=slug, color=color)
+                for name, slug, color in TAGS
+            ], ignore_conflicts=True)
+            users = self.create_users(options["users"], options["seed"])
+            recipes = self.create_recipes(
+                users, options["recipes"],
+                options["ingredients_per_recipe"], options["skew"])
+            follows = self.create_relations(
+                Follow, users, users, 'author_id',
+                options["follows"], options["skew"])
+            favorites = self.create_relations(
+                Favorite, users, recipes, 'recipe_id',
+                options["favorites"], options["skew"])
+            carts = self.create_relations(
+                ShopingCart, users, recipes, 'recipe_id',
+                options["cart"], options["skew"])
+            for batch in self.batches(recipes):
+                recount_recipe_stats(batch)
+                update_search_vector(batch)
+            for batch in self.batches(users):
+                recount_user_stats(batch)
+                rebuild_shopping_lists(batch)
+        bump_content_version()
+        bump_content_version(INGREDIENTS_VERSION_KEY)
+        self.stdout.write(
+            f'Пользователей: {len(users)}, рецептов: {len(recipes)}, '
+            f'подписок: {follows}, избранных: {favorites}, '
+            f'в корзинах: {carts} '
+            f'за {time.perf_counter() - started:.2f} с'
+        )
+
+    def batches(self, items):
+        for start in range(0, len(items), self.batch_size):
+            yield items[start:start + self.batch_size]
+
+    def create_users(self, count, seed):
+        password = make_password(PASSWORD)
+        usernames = [f'bench{seed}_{number}' for number in range(count)]
+        User.objects.bulk_create([
+            User(
+                username=username,
+                email=f'{username}@example.com',
+                first_name='Тест',
+                last_name=f'Пользователь {number}',
+                password=password,
+            )
+            for number, username in enumerate(usernames)
+        ], batch_size=self.batch_size, ignore_conflicts=True)
+        ids = dict(User.objects.filter(
+            username__in=usernames).values_list('username', 'id'))
+        return [ids[username] for username in usernames]
+
+    def create_recipes(self, users, per_user, ingredients_count, skew):
+        image = ensure_image()
+        ingredients = list(Ingredient.objects.values_list('id', flat=True))
+        tags = list(Tag.objects.values_list('id', flat=True))
+        authors = self.rng.choices(
+            users, skewed_weights(len(users), skew),
+            k=len(users) * per_user)
+        last_id = Recipe.objects.order_by('-id').values_list(
+            'id', flat=True).first() or 0
+        Recipe.objects.bulk_create([
+            Recipe(
+                author_id=author_id,
+                name=f'Рецепт {number}',
+                image=image,
+                text='Смешать все ингредиенты и готовить до готовности.',
+                cooking_time=self.rng.randint(5, 120),
+            )
+            for number, author_id in enumerate(authors)
+        ], batch_size=self.batch_size)
+        recipes = list(Recipe.objects.filter(id__gt=last_id).order_by(
+            'id').values_list('id', flat=True))
+
+        now = timezone.now()
+        dated = [
+            Recipe(id=recipe_id, pub_date=now - timedelta(
+                minutes=self.rng.randint(0, 60 * 24 * 365)))
+            for recipe_id in recipes
+        ]
+        Recipe.objects.bulk_update(
+            dated, ['pub_date'], batch_size=self.batch_size)
+
+        IngredientInRecipe.objects.bulk_create([
+            IngredientInRecipe(
+                recipe_id=recipe_id,
+                ingredients_id=ingredient_id,
+                amount=self.rng.randint(1, 500),
+            )
+            for recipe_id in recipes
+            for ingredient_id in self.rng.sample(
+                ingredients, min(ingredients_count, len(ingredients)))
+        ], batch_size=self.batch_size)
+        RecipeTag = Recipe.tags.through
+        RecipeTag.objects.bulk_create([
+            RecipeTag(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipes
+            for tag_id in self.rng.sample(
+                tags, self.rng.randint(1, min(2, len(tags))))
+        ], batch_size=self.batch_size)
+        return recipes
+
+    def create_relations(self, model, users, targets, field, count, skew):
+        weights = skewed_weights(len(targets), skew)
+        rows = [
+            model(user_id=user_id, **{field: target_id})
+            for user_id in users
+            for target_id in pick_unique(
+                self.rng, targets, weights, count,
+                exclude=user_id if model is Follow else None)
+        ]
+        model.objects.bulk_create(
+            rows, batch_size=self.batch_size, ignore_conflicts=True)
+        return len(rows)
@@ -1,21 +1,38 @@
-import json
+import os
 
 from django.core.management.base import BaseCommand
-from recipe.models import Ingredient
+
+from api.cache import bump_content_version
+from api.ingredient_index import INGREDIENTS_VERSION_KEY
+from recipe.importers import import_ingredients, iter_csv, iter_json_array
 
 
 class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("--path", type=str, help="file path")
+        parser.add_argument(
+            "--format", choices=("json", "csv"),
+            help="file format, detected by extension by default")
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="rows per bulk insert")
 
     def handle(self, *args, **options):
         file_path = options["path"]
+        file_format = options["format"] or (
+            'csv' if os.path.splitext(file_path)[1].lower() == '.csv'
+            else 'json')
+        parse = iter_csv if file_format == 'csv' else iter_json_array
 
-        with open(file_path, encoding='utf-8') as f:
+        with open(file_path, encoding='utf-8', newline='') as f:
+            stats = import_ingredients(parse(f), options["batch_size"])
 
-            data = json.load(f)
-            for item in data:
-                Ingredient.objects.create(
-                    name=item['name'],
-                    measurement_unit=item['measurement_unit'])
+        bump_content_version()
+        bump_content_version(INGREDIENTS_VERSION_KEY)
+        self.stdout.write(
+            f'Прочитано строк: {stats["total"]}, '
+            f'уникальных: {stats["unique"]}, '
+            f'добавлено: {stats["created"]} '
+            f'за {stats["elapsed"]:.2f} с ({stats["rate"]:.0f} строк/с)'
+        )
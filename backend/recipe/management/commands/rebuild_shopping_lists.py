@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from api.shopping_list import rebuild_shopping_lists
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает списки покупок из корзин пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        users = 0
+        last_pk = 0
+        while True:
+            batch = list(User.objects.filter(pk__gt=last_pk).order_by(
+                'pk').values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                break
+            rebuild_shopping_lists(batch)
+            users += len(batch)
+            last_pk = batch[-1]
+        self.stdout.write(f'Пересчитаны списки покупок: {users}')
@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from api.counters import recount_recipe_stats, recount_user_stats
+from recipe.models import Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики рецептов и пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        recipes = self.recount(Recipe, recount_recipe_stats, batch_size)
+        users = self.recount(User, recount_user_stats, batch_size)
+        self.stdout.write(
+            f'Исправлено рецептов: {recipes}, пользователей: {users}')
+
+    def recount(self, model, recount, batch_size):
+        fixed = 0
+        last_pk = 0
+        while True:
+            batch = list(model.objects.filter(pk__gt=last_pk).order_by(
+                'pk').values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                return fixed
+            fixed += recount(batch)
+            last_pk = batch[-1]
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from api.search import update_search_vector
+from recipe.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает поисковые векторы рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        recipe_ids = list(Recipe.objects.values_list('pk', flat=True))
+        for start in range(0, len(recipe_ids), batch_size):
+            update_search_vector(recipe_ids[start:start + batch_size])
+        self.stdout.write(f'Обновлено рецептов: {len(recipe_ids)}')
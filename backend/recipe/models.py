@@ -1,8 +1,11 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 
 from django.contrib.auth import get_user_model
 
+from .indexes import PortableGinIndex
+
 User = get_user_model()
 
 
@@ -18,6 +21,12 @@ class Ingredient(models.Model):
     class Meta:
         ordering = ['name']
         verbose_name = 'ингредиент'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient_unit',
+            )
+        ]
 
     def __str__(self):
         return f'{self.name}, {self.measurement_unit}'
@@ -89,15 +98,61 @@ class Recipe(models.Model):
             'минимальное время приготовления 1 минута'
         )]
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='число добавлений в избранное'
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='число добавлений в корзину'
+    )
+    processed_image = models.CharField(
+        max_length=100,
+        blank=True,
+        editable=False,
+        verbose_name='картинка, для которой готовы копии'
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='поисковый вектор'
+    )
+
+    # Меняются только запросами UPDATE, обычный save() их не перезаписывает
+    QUERY_UPDATED_FIELDS = (
+        'favorites_count', 'in_carts_count', 'processed_image',
+        'search_vector',
+    )
 
     class Meta:
         ordering = ["-pub_date"]
         verbose_name = 'рецепт'
         verbose_name_plural = 'рецепты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='recipe_pub_date_id_idx'),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='recipe_author_pub_date_idx'),
+            PortableGinIndex(
+                fields=['search_vector'], name='recipe_search_vector_gin'),
+            PortableGinIndex(
+                fields=['name'], name='recipe_name_trgm',
+                opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self) -> str:
         return f'{self.name}'
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.QUERY_UPDATED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class IngredientInRecipe(models.Model):
     ingredients = models.ForeignKey(
@@ -146,6 +201,7 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Автор',
         related_name='following',
+        db_index=False,
     )
 
     class Meta:
@@ -158,6 +214,10 @@ class Follow(models.Model):
                 name='unique_follow',
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'),
+        ]
 
 
 class Favorite(models.Model):
@@ -172,6 +232,7 @@ class Favorite(models.Model):
         on_delete=models.CASCADE,
         verbose_name='рецепт',
         related_name='favorites',
+        db_index=False,
     )
 
     class Meta:
@@ -182,6 +243,10 @@ class Favorite(models.Model):
             models.UniqueConstraint(fields=['user', 'recipe'],
                                     name='unique_user_recipe')
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'], name='favorite_recipe_user_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user}'
@@ -198,7 +263,8 @@ class ShopingCart(models.Model):
         Recipe,
         on_delete=models.CASCADE,
         verbose_name='рецепт',
-        related_name='cart'
+        related_name='cart',
+        db_index=False,
     )
 
     class Meta:
@@ -209,3 +275,38 @@ class ShopingCart(models.Model):
             models.UniqueConstraint(fields=['user', 'recipe'],
                                     name='unique_cart_user')
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'], name='cart_recipe_user_idx'),
+        ]
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='пользователь',
+        db_index=False,
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='ингредиент'
+    )
+    total_amount = models.IntegerField(
+        default=0,
+        verbose_name='количество'
+    )
+
+    class Meta:
+        verbose_name = 'строка списка покупок'
+        verbose_name_plural = 'список покупок'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'ingredient'],
+                                    name='unique_shopping_list_item')
+        ]
+
+    def __str__(self):
+        return f'{self.user} - {self.ingredient}'
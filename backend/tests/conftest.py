@@ -0,0 +1,92 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from recipe.models import (Favorite, Follow, Ingredient, IngredientInRecipe,
+                           Recipe, ShopingCart, Tag)
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='reader', email='reader@foodgram.ru', password='pass',
+        first_name='Читатель', last_name='Рецептов')
+
+
+@pytest.fixture
+def author(django_user_model):
+    return django_user_model.objects.create_user(
+        username='author', email='author@foodgram.ru', password='pass',
+        first_name='Автор', last_name='Рецептов')
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def tags():
+    return [
+        Tag.objects.create(name=f'Тег {number}', slug=f'tag{number}',
+                           color='#E26C2D')
+        for number in range(3)
+    ]
+
+
+@pytest.fixture
+def ingredients():
+    return [
+        Ingredient.objects.create(
+            name=f'Ингредиент {number}', measurement_unit='г')
+        for number in range(10)
+    ]
+
+
+@pytest.fixture
+def create_recipes(author, tags, ingredients):
+    def create(count, author=author):
+        recipes = []
+        for number in range(count):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Рецепт {number}',
+                image=f'recipes/recipe{number}.png',
+                text='Смешать и запечь', cooking_time=10 + number)
+            recipe.tags.set(tags[number % 2:number % 2 + 2])
+            IngredientInRecipe.objects.bulk_create([
+                IngredientInRecipe(
+                    recipe=recipe, amount=number + index + 1,
+                    ingredients=ingredients[(number + index) % 10])
+                for index in range(3)
+            ])
+            recipes.append(recipe)
+        return recipes
+    return create
+
+
+@pytest.fixture
+def recipes(create_recipes, user, author):
+    recipes = create_recipes(12)
+    for recipe in recipes[::2]:
+        Favorite.objects.create(user=user, recipe=recipe)
+        ShopingCart.objects.create(user=user, recipe=recipe)
+    Follow.objects.create(user=user, author=author)
+    return recipes
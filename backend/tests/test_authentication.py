@@ -0,0 +1,42 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import get_token_cache_key
+
+
+@pytest.fixture
+def token_client(user, settings):
+    settings.TOKEN_CACHE_TIMEOUT = 60
+    client = APIClient()
+    response = client.post('/api/auth/token/login/', {
+        'email': user.email, 'password': 'pass'})
+    assert response.status_code == 200
+    client.key = response.json()['auth_token']
+    client.credentials(HTTP_AUTHORIZATION=f'Token {client.key}')
+    assert client.get('/api/users/me/').status_code == 200
+    assert cache.get(get_token_cache_key(client.key)) is not None
+    return client
+
+
+@pytest.mark.django_db(transaction=True)
+def test_logout_rejects_cached_token(token_client):
+    assert token_client.post('/api/auth/token/logout/').status_code == 204
+    assert token_client.get('/api/users/me/').status_code == 401
+
+
+@pytest.mark.django_db(transaction=True)
+def test_deactivated_user_rejects_cached_token(user, token_client):
+    user.is_active = False
+    user.save()
+    assert token_client.get('/api/users/me/').status_code == 401
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rotated_token_rejects_cached_token(user, token_client):
+    Token.objects.filter(user=user).delete()
+    token = Token.objects.create(user=user)
+    assert token_client.get('/api/users/me/').status_code == 401
+    token_client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    assert token_client.get('/api/users/me/').status_code == 200
@@ -0,0 +1,52 @@
+import pytest
+
+from api.queries import insert_ignore, raw_delete
+from recipe.models import Favorite, Follow, Recipe, ShopingCart
+from users.models import UserStats
+
+
+def get_statuses(response):
+    assert response.status_code == 200
+    return {item['id']: item['status'] for item in response.json()['results']}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('model, url, counter', [
+    (Favorite, '/api/recipes/batch/favorite/', 'favorites_count'),
+    (ShopingCart, '/api/recipes/batch/shopping_cart/', 'in_carts_count'),
+])
+def test_batch_counts_only_written_rows(
+        user, user_client, create_recipes, model, url, counter):
+    first, second = create_recipes(2)
+    # Строка, вставленная параллельным запросом, счётчик не меняет
+    insert_ignore(model, user=user.id, recipe=first.id)
+    statuses = get_statuses(user_client.post(
+        url, {'ids': [first.id, second.id, 999999]}, format='json'))
+    assert statuses == {
+        first.id: 'exists', second.id: 'created', 999999: 'not_found'}
+    counts = dict(Recipe.objects.values_list('id', counter))
+    assert counts == {first.id: 0, second.id: 1}
+
+    raw_delete(model.objects.filter(user=user, recipe=second))
+    statuses = get_statuses(user_client.delete(
+        url, {'ids': [first.id, second.id]}, format='json'))
+    assert statuses == {first.id: 'deleted', second.id: 'not_found'}
+    assert not model.objects.filter(user=user).exists()
+    counts = dict(Recipe.objects.values_list('id', counter))
+    assert counts == {first.id: 0, second.id: 1}
+
+
+@pytest.mark.django_db
+def test_batch_follow_counts_only_written_rows(user, author, user_client):
+    insert_ignore(Follow, user=user.id, author=author.id)
+    statuses = get_statuses(user_client.post(
+        '/api/users/batch/subscribe/', {'ids': [author.id, user.id]},
+        format='json'))
+    assert statuses == {author.id: 'exists', user.id: 'not_found'}
+    assert not UserStats.objects.filter(
+        user=author, followers_count__gt=0).exists()
+
+    statuses = get_statuses(user_client.delete(
+        '/api/users/batch/subscribe/', {'ids': [author.id]}, format='json'))
+    assert statuses == {author.id: 'deleted'}
+    assert not Follow.objects.exists()
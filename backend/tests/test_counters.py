@@ -0,0 +1,86 @@
+import base64
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from recipe.models import Favorite, Follow, Recipe, ShopingCart
+from users.models import UserStats
+
+
+def assert_counters_exact(users):
+    for user in users:
+        stats = UserStats.objects.filter(user=user).first()
+        assert (
+            getattr(stats, 'recipes_count', 0),
+            getattr(stats, 'followers_count', 0),
+        ) == (
+            Recipe.objects.filter(author=user).count(),
+            Follow.objects.filter(author=user).count(),
+        )
+    for recipe in Recipe.objects.all():
+        assert (recipe.favorites_count, recipe.in_carts_count) == (
+            Favorite.objects.filter(recipe=recipe).count(),
+            ShopingCart.objects.filter(recipe=recipe).count(),
+        )
+
+
+def make_image():
+    buffer = BytesIO()
+    Image.new('RGB', (2, 2)).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()).decode()
+
+
+@pytest.mark.django_db
+def test_api_recipe_create_and_delete_keep_counters(
+        user, user_client, tags, ingredients):
+    response = user_client.post('/api/recipes/', {
+        'name': 'Рецепт',
+        'text': 'Смешать',
+        'cooking_time': 5,
+        'image': make_image(),
+        'tags': [tags[0].id],
+        'ingredients': [{'id': ingredients[0].id, 'amount': 3}],
+    }, format='json')
+    assert response.status_code == 201
+    assert user.stats.recipes_count == 1
+    assert_counters_exact([user])
+
+    recipe = Recipe.objects.get()
+    assert user_client.delete(
+        f'/api/recipes/{recipe.id}/').status_code == 204
+    user.stats.refresh_from_db()
+    assert user.stats.recipes_count == 0
+    assert_counters_exact([user])
+
+
+@pytest.mark.django_db
+def test_orm_changes_keep_counters(user, author, create_recipes):
+    recipe, moved = create_recipes(2)
+    assert_counters_exact([user, author])
+    moved.author = user
+    moved.save()
+    assert_counters_exact([user, author])
+    Favorite.objects.create(user=user, recipe=recipe)
+    ShopingCart.objects.create(user=user, recipe=recipe)
+    Follow.objects.create(user=user, author=author)
+    assert_counters_exact([user, author])
+    moved.delete()
+    assert_counters_exact([user, author])
+
+
+@pytest.mark.django_db
+def test_user_delete_keeps_counters(
+        django_user_model, author, create_recipes):
+    follower = django_user_model.objects.create_user(
+        username='follower', email='follower@foodgram.ru', password='pass')
+    recipe, = create_recipes(1)
+    Favorite.objects.create(user=follower, recipe=recipe)
+    ShopingCart.objects.create(user=follower, recipe=recipe)
+    Follow.objects.create(user=follower, author=author)
+    Follow.objects.create(user=author, author=follower)
+    follower.delete()
+    assert_counters_exact([author])
+    recipe.refresh_from_db()
+    assert (recipe.favorites_count, recipe.in_carts_count) == (0, 0)
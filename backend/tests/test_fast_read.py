@@ -0,0 +1,35 @@
+import pytest
+from django.core.cache import cache
+
+URLS = (
+    '/api/recipes/',
+    '/api/recipes/?page=2',
+    '/api/recipes/?limit=50&ordering=popular',
+    '/api/recipes/?pagination=cursor',
+    '/api/recipes/?tags=tag0&tags=tag1',
+    '/api/recipes/?author={author_id}',
+    '/api/recipes/?is_favorited=1',
+    '/api/recipes/?is_in_shopping_cart=1',
+    '/api/recipes/feed/?limit=20',
+    '/api/recipes/{recipe_id}/',
+    '/api/recipes/{recipe_id}/?format=json',
+)
+
+
+def get_content(client, url, settings, fast_read):
+    settings.API_FAST_READ = fast_read
+    cache.clear()
+    response = client.get(url)
+    return response.status_code, response.content
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url', URLS)
+@pytest.mark.parametrize('authenticated', [False, True])
+def test_fast_read_matches_serializers(
+        client, user_client, recipes, author, settings, url,
+        authenticated):
+    url = url.format(author_id=author.id, recipe_id=recipes[0].id)
+    client = user_client if authenticated else client
+    assert get_content(client, url, settings, True) == get_content(
+        client, url, settings, False)
@@ -0,0 +1,39 @@
+import pytest
+from django.db import transaction
+
+from recipe.models import Follow
+
+
+def get_feed_ids(client):
+    response = client.get('/api/recipes/feed/?limit=50')
+    assert response.status_code == 200
+    return [recipe['id'] for recipe in response.json()['results']]
+
+
+@pytest.fixture
+def follower_feed(user, author, user_client, create_recipes, settings):
+    settings.IMAGE_PIPELINE_SYNC = True
+    Follow.objects.create(user=user, author=author)
+    recipes = create_recipes(2)
+    assert get_feed_ids(user_client) == [
+        recipe.id for recipe in reversed(recipes)]
+    return recipes
+
+
+@pytest.mark.django_db(transaction=True)
+def test_feed_shows_committed_changes(
+        user_client, follower_feed, create_recipes):
+    recipe, = create_recipes(1)
+    assert get_feed_ids(user_client)[0] == recipe.id
+    recipe.delete()
+    assert recipe.id not in get_feed_ids(user_client)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_feed_ignores_rolled_back_recipe(
+        user_client, follower_feed, create_recipes):
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            recipe, = create_recipes(1)
+            raise RuntimeError
+    assert recipe.id not in get_feed_ids(user_client)
@@ -0,0 +1,121 @@
+import pytest
+from django.db import connection
+from django.db.models import Exists, OuterRef
+
+from recipe.models import Favorite, Follow, Recipe, ShopingCart
+
+RecipeTag = Recipe.tags.through
+
+# Запрос, таблица и столбцы индексов, которыми он может пользоваться.
+# Запросы без условий только читают индекс по порядку сортировки.
+HOT_QUERIES = {
+    'recipes_feed': (
+        lambda user, recipe, tag_ids: (
+            Recipe.objects.order_by('-pub_date', '-id')[:6]),
+        Recipe, [('pub_date', 'id')], False),
+    'recipes_by_author': (
+        lambda user, recipe, tag_ids: Recipe.objects.filter(
+            author_id=recipe.author_id).order_by('-pub_date')[:6],
+        Recipe, [('author_id', 'pub_date')], True),
+    'recipes_by_tags': (
+        lambda user, recipe, tag_ids: Recipe.objects.annotate(
+            has_tags=Exists(RecipeTag.objects.filter(
+                recipe_id=OuterRef('pk'), tag_id__in=tag_ids))
+        ).filter(has_tags=True).order_by('-pub_date')[:6],
+        RecipeTag, [('recipe_id', 'tag_id'), ('recipe_id',)], True),
+    'favorites_of_user': (
+        lambda user, recipe, tag_ids: Favorite.objects.filter(
+            user=user).values('recipe_id'),
+        Favorite, [('user_id', 'recipe_id'), ('user_id',)], True),
+    'favorite_probe': (
+        lambda user, recipe, tag_ids: Favorite.objects.filter(
+            user=user, recipe=recipe).values('id'),
+        Favorite, [('user_id', 'recipe_id')], True),
+    'favorites_of_recipe': (
+        lambda user, recipe, tag_ids: Favorite.objects.filter(
+            recipe=recipe).values('user_id'),
+        Favorite, [('recipe_id', 'user_id')], True),
+    'cart_of_user': (
+        lambda user, recipe, tag_ids: ShopingCart.objects.filter(
+            user=user).values('recipe_id'),
+        ShopingCart, [('user_id', 'recipe_id'), ('user_id',)], True),
+    'carts_of_recipe': (
+        lambda user, recipe, tag_ids: ShopingCart.objects.filter(
+            recipe=recipe).values('user_id'),
+        ShopingCart, [('recipe_id', 'user_id')], True),
+    'followers_of_author': (
+        lambda user, recipe, tag_ids: Follow.objects.filter(
+            author_id=recipe.author_id).values('user_id'),
+        Follow, [('author_id', 'user_id')], True),
+}
+
+
+def get_index_names(model, column_sets):
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # Уникальные ограничения SQLite хранит как sqlite_autoindex_*
+            cursor.execute(f'PRAGMA index_list("{table}")')
+            indexes = {}
+            for row in cursor.fetchall():
+                cursor.execute(f'PRAGMA index_info("{row[1]}")')
+                indexes[row[1]] = [info[2] for info in cursor.fetchall()]
+        else:
+            indexes = {
+                name: constraint['columns'] for name, constraint in
+                connection.introspection.get_constraints(
+                    cursor, table).items()
+                if constraint['index'] or constraint['unique']
+            }
+    return {name for name, columns in indexes.items()
+            if tuple(columns) in column_sets}
+
+
+def get_index_lines(plan, names):
+    """Строки плана, где читается один из индексов, с их условиями"""
+    lines = plan.splitlines()
+    for number, line in enumerate(lines):
+        if any(f' {name} ' in f' {line} ' for name in names):
+            details = []
+            indent = len(line) - len(line.lstrip())
+            for detail in lines[number + 1:]:
+                if len(detail) - len(detail.lstrip()) <= indent:
+                    break
+                details.append(detail)
+            yield line, details
+
+
+def is_sequential(plan):
+    if connection.vendor == 'postgresql':
+        return 'Seq Scan' in plan
+    return any(
+        'SCAN ' in line and 'USING' not in line
+        for line in plan.splitlines()
+    )
+
+
+def is_lookup(line, details):
+    if connection.vendor == 'postgresql':
+        return any('Index Cond' in detail for detail in details)
+    return 'SEARCH ' in line
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', HOT_QUERIES)
+def test_hot_query_uses_index(user, recipes, tags, name):
+    build, model, column_sets, filtered = HOT_QUERIES[name]
+    queryset = build(user, recipes[0], [tag.id for tag in tags[:2]])
+    index_names = get_index_names(model, column_sets)
+    assert index_names
+    if connection.vendor == 'postgresql':
+        # На маленьких тестовых таблицах перебор дешевле индекса
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+    plan = queryset.explain()
+    assert not is_sequential(plan), plan
+    index_lines = list(get_index_lines(plan, index_names))
+    assert index_lines, plan
+    if filtered:
+        assert all(
+            is_lookup(line, details) for line, details in index_lines
+        ), plan
@@ -0,0 +1,64 @@
+import pytest
+
+from recipe.models import ShopingCart
+
+RECIPE_LIST_QUERIES = 4
+USER_RECIPE_LIST_QUERIES = 7
+SHOPPING_LIST_QUERIES = 1
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('fast_read', [True, False])
+@pytest.mark.parametrize('limit', [1, 6, 12])
+def test_recipe_list_queries_do_not_depend_on_page_size(
+        client, recipes, settings, django_assert_num_queries, limit,
+        fast_read):
+    settings.API_FAST_READ = fast_read
+    with django_assert_num_queries(RECIPE_LIST_QUERIES):
+        response = client.get(f'/api/recipes/?limit={limit}')
+    assert len(response.json()['results']) == limit
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('fast_read', [True, False])
+@pytest.mark.parametrize('limit', [1, 6, 12])
+def test_user_recipe_list_queries_do_not_depend_on_page_size(
+        user_client, recipes, settings, django_assert_num_queries, limit,
+        fast_read):
+    settings.API_FAST_READ = fast_read
+    with django_assert_num_queries(USER_RECIPE_LIST_QUERIES):
+        response = user_client.get(f'/api/recipes/?limit={limit}')
+    assert len(response.json()['results']) == limit
+
+
+@pytest.fixture
+def fill_cart(user, create_recipes):
+    def fill(size):
+        for recipe in create_recipes(size):
+            ShopingCart.objects.create(user=user, recipe=recipe)
+    return fill
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('cart_size', [1, 5, 20])
+def test_shopping_list_queries_do_not_depend_on_cart_size(
+        user_client, fill_cart, django_assert_num_queries, cart_size):
+    fill_cart(cart_size)
+    with django_assert_num_queries(SHOPPING_LIST_QUERIES):
+        response = user_client.get('/api/recipes/shopping_list/')
+    assert len(response.json()) == min(cart_size + 2, 10)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('file_format', ['txt', 'csv', 'pdf'])
+@pytest.mark.parametrize('cart_size', [1, 5, 20])
+def test_download_queries_do_not_depend_on_cart_size(
+        user_client, fill_cart, django_assert_num_queries, cart_size,
+        file_format):
+    fill_cart(cart_size)
+    with django_assert_num_queries(SHOPPING_LIST_QUERIES):
+        response = user_client.get(
+            f'/api/recipes/download_shopping_cart/?format={file_format}')
+        content = b''.join(response.streaming_content)
+    assert response.status_code == 200
+    assert content
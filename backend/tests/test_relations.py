@@ -0,0 +1,20 @@
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from api.cache import RELATIONS_KEY, get_user_relations
+from recipe.models import Favorite
+
+
+@pytest.mark.django_db(transaction=True)
+def test_relations_reset_after_commit(user, recipes):
+    recipe = recipes[1]
+    relations = get_user_relations(user)
+    assert recipe.id not in relations['favorites']
+    with transaction.atomic():
+        Favorite.objects.create(user=user, recipe=recipe)
+        # Параллельный запрос до коммита видит старые связи и кэширует их
+        cache.set(RELATIONS_KEY.format(user.id), relations,
+                  settings.RELATIONS_CACHE_TIMEOUT)
+    assert recipe.id in get_user_relations(user)['favorites']
@@ -0,0 +1,56 @@
+import pytest
+from django.db.models import Sum
+from rest_framework.test import APIClient
+
+from recipe.models import IngredientInRecipe, ShoppingListItem
+
+
+def assert_matches_carts(*users):
+    for user in users:
+        expected = dict(IngredientInRecipe.objects.filter(
+            recipe__cart__user=user
+        ).values('ingredients_id').annotate(
+            total=Sum('amount')).values_list('ingredients_id', 'total'))
+        actual = dict(ShoppingListItem.objects.filter(
+            user=user).values_list('ingredient_id', 'total_amount'))
+        assert actual == expected
+
+
+@pytest.mark.django_db
+def test_shopping_list_follows_carts_and_recipes(
+        user, author, user_client, create_recipes, ingredients, tags):
+    author_client = APIClient()
+    author_client.force_authenticate(author)
+    recipes = create_recipes(5)
+    for recipe in recipes[:3]:
+        user_client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+    for recipe in recipes[:2]:
+        author_client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+    assert_matches_carts(user, author)
+
+    user_client.delete(f'/api/recipes/{recipes[1].id}/shopping_cart/')
+    assert_matches_carts(user, author)
+
+    user_client.post('/api/recipes/batch/shopping_cart/', {
+        'ids': [recipe.id for recipe in recipes[1:]]}, format='json')
+    assert_matches_carts(user, author)
+    user_client.delete('/api/recipes/batch/shopping_cart/', {
+        'ids': [recipes[3].id]}, format='json')
+    assert_matches_carts(user, author)
+
+    response = author_client.patch(f'/api/recipes/{recipes[0].id}/', {
+        'name': 'Новое название',
+        'text': 'Новый текст',
+        'cooking_time': 5,
+        'tags': [tags[0].id],
+        'ingredients': [
+            {'id': ingredients[0].id, 'amount': 5},
+            {'id': ingredients[3].id, 'amount': 7},
+        ],
+    }, format='json')
+    assert response.status_code == 200
+    assert_matches_carts(user, author)
+
+    response = author_client.delete(f'/api/recipes/{recipes[0].id}/')
+    assert response.status_code == 204
+    assert_matches_carts(user, author)
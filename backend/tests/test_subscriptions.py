@@ -0,0 +1,18 @@
+import pytest
+
+
+@pytest.mark.django_db
+def test_subscriptions_without_follows(user_client):
+    response = user_client.get('/api/users/subscriptions/?recipes_limit=3')
+    assert response.status_code == 200
+    assert response.json()['results'] == []
+
+
+@pytest.mark.django_db
+def test_subscriptions_limit_recipes(author, user_client, recipes):
+    response = user_client.get('/api/users/subscriptions/?recipes_limit=3')
+    assert response.status_code == 200
+    subscription, = response.json()['results']
+    assert subscription['id'] == author.id
+    assert len(subscription['recipes']) == 3
+    assert subscription['recipes_count'] == len(recipes)
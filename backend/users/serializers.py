@@ -3,7 +3,7 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from djoser.conf import settings
 
-from recipe.models import Follow
+from api.cache import get_user_relations
 
 User = get_user_model()
 
@@ -26,4 +26,5 @@ class CustomUserSerializer(UserSerializer):
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
-        return Follow.objects.filter(user=user, author=obj.id).exists()
\ No newline at end of file
+        relations = self.context.get('relations') or get_user_relations(user)
+        return obj.id in relations['following']
\ No newline at end of file